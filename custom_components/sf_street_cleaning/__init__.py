@@ -2,50 +2,121 @@
 from __future__ import annotations
 
 import logging
-import json
-import asyncio
+
+import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.config_validation as cv
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .const import DOMAIN, GEOJSON_URL
+from .const import (
+    DOMAIN,
+    SERVICE_LOOKUP,
+    ATTR_STREET,
+    ATTR_SIDE,
+    ATTR_NEXT_CLEANING,
+    ATTR_DISTANCE,
+)
+from .coordinator import async_get_coordinator, dataset_url
+from .geometry import find_cleaning_data_batch
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
+LOOKUP_SCHEMA = vol.Schema(
+    {
+        vol.Required("points"): vol.All(
+            cv.ensure_list,
+            [
+                vol.Schema(
+                    {
+                        vol.Required("latitude"): cv.latitude,
+                        vol.Required("longitude"): cv.longitude,
+                        vol.Optional("heading", default=0): vol.Coerce(float),
+                    }
+                )
+            ],
+        ),
+    }
+)
+
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the SF Street Cleaning integration component."""
     hass.data.setdefault(DOMAIN, {})
+
+    async def async_handle_lookup(call: ServiceCall) -> ServiceResponse:
+        """Resolve street, side and next cleaning for a list of points."""
+        stores = [segments for segments in async_get_coordinator(hass).segment_cache.values() if segments]
+        if not stores:
+            raise HomeAssistantError("Street cleaning data is not loaded yet")
+
+        points = call.data["points"]
+        lats = [point["latitude"] for point in points]
+        lons = [point["longitude"] for point in points]
+        rotations = [int(point["heading"]) % 360 for point in points]
+        # Large traces are resolved off the event loop
+        results = await hass.async_add_executor_job(
+            _lookup_in_stores, stores, lats, lons, rotations
+        )
+
+        response = []
+        for lat, lon, result in zip(lats, lons, results):
+            entry = {"latitude": lat, "longitude": lon}
+            if result:
+                next_cleaning = result.get("nextCleaning")
+                if isinstance(next_cleaning, dict):
+                    next_cleaning = next_cleaning.get("NextCleaning")
+                entry.update(
+                    {
+                        ATTR_STREET: result.get("street"),
+                        ATTR_SIDE: result.get("parkedOnSide"),
+                        ATTR_NEXT_CLEANING: next_cleaning,
+                        ATTR_DISTANCE: result.get("distance"),
+                    }
+                )
+            response.append(entry)
+        return {"results": response}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_LOOKUP,
+        async_handle_lookup,
+        schema=LOOKUP_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
     return True
 
+def _lookup_in_stores(stores: list, lats: list, lons: list, rotations: list) -> list:
+    """Batch lookup against every loaded dataset, keeping the closest match per point."""
+    best = find_cleaning_data_batch(stores[0], lats, lons, rotations)
+    for segments in stores[1:]:
+        for i, result in enumerate(find_cleaning_data_batch(segments, lats, lons, rotations)):
+            if result and (best[i] is None or result["distance"] < best[i]["distance"]):
+                best[i] = result
+    return best
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up SF Street Cleaning from a config entry."""
     
     hass.data.setdefault(DOMAIN, {})
-    geojson_url = entry.data.get("geojson_url") or GEOJSON_URL
-    hass.data[DOMAIN]["geojson_url"] = geojson_url
-    
+    geojson_url = dataset_url(entry.data)
+
+    # One coordinator owns the datasets and refresh schedule for all entries
+    coordinator = async_get_coordinator(hass)
+    entry.async_on_unload(coordinator.async_register_entry())
+
     # Load GeoJSON Data
-    # We load this once during setup and store it in hass.data
-    if "geojson" not in hass.data[DOMAIN]:
-        try:
-            session = async_get_clientsession(hass)
-            _LOGGER.info("Fetching SF Street Cleaning GeoJSON from %s", geojson_url)
-            async with session.get(geojson_url) as response:
-                response.raise_for_status()
-                # GitHub raw returns text/plain; allow parse despite content-type
-                geojson_data = await response.json(content_type=None)
-                hass.data[DOMAIN]["geojson"] = geojson_data
-                _LOGGER.info("Successfully loaded %d features from GeoJSON", len(geojson_data.get("features", [])))
-        except Exception as err:
-            _LOGGER.error("Error fetching/parsing GeoJSON data: %s", err)
-            # We can still proceed, but the sensor will be useless until reload
-            hass.data[DOMAIN]["geojson"] = {}
+    # Loading runs as a background task so setup (and Home Assistant startup)
+    # never waits on the network; the sensor reports "Loading" until it lands.
+    # Without a URL the sensor picks the neighborhood itself once added.
+    if geojson_url is not None and coordinator.segments(geojson_url) is None:
+        entry.async_create_background_task(
+            hass, coordinator.async_load_segments(geojson_url), f"{DOMAIN}_load_segments"
+        )
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
@@ -0,0 +1,113 @@
+"""Timer-driven street cleaning alerts for SF Street Cleaning."""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from functools import partial
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.util import dt as dt_util
+
+from .const import ALERT_SETTLE_SECONDS, EVENT_ALERT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AlertScheduler:
+    """
+    Fires EVENT_ALERT once per lead time per parking session. A session is the
+    vehicle staying on the same street side for the same upcoming cleaning;
+    each lead time gets one async_track_point_in_time timer. Nothing fires
+    until the vehicle has stayed put for ALERT_SETTLE_SECONDS, so driving past
+    a street that is about to be swept does not trigger alerts. Thresholds that
+    had already passed when the session started collapse into a single alert
+    for the most urgent one.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        lead_times: list[timedelta],
+        settle: timedelta = timedelta(seconds=ALERT_SETTLE_SECONDS),
+    ) -> None:
+        self.hass = hass
+        self.lead_times = sorted(set(lead_times), reverse=True)
+        self.settle = settle
+        self._session: tuple | None = None
+        self._session_start: datetime | None = None
+        self._cleaning_start: datetime | None = None
+        self._data: dict = {}
+        self._fired: set[timedelta] = set()
+        self._unsubs: dict[timedelta, CALLBACK_TYPE] = {}
+        self._armed = False
+
+    @callback
+    def async_update(self, session: tuple | None, cleaning_start: datetime | None, data: dict) -> None:
+        """
+        Track the current parking session. `session` identifies where the
+        vehicle is parked (None when unknown); `data` is sent with every alert.
+        """
+        if session is None or cleaning_start is None or not self.lead_times:
+            # Keep the session so a brief tracker dropout does not re-fire alerts
+            self.async_cancel()
+            return
+        self._data = data
+        if (session, cleaning_start) == (self._session, self._cleaning_start):
+            if not self._armed:
+                self._async_arm()
+            return
+
+        self.async_cancel()
+        self._session = session
+        self._cleaning_start = cleaning_start
+        self._session_start = dt_util.utcnow()
+        self._fired = set()
+        self._async_arm()
+
+    @callback
+    def _async_arm(self) -> None:
+        earliest = self._session_start + self.settle
+        pending = [lead for lead in self.lead_times if lead not in self._fired]
+        if self._cleaning_start <= earliest:
+            # Parked after cleaning began: lead-time alerts no longer apply
+            self._fired.update(pending)
+            pending = []
+        overdue = [lead for lead in pending if self._cleaning_start - lead < earliest]
+        if len(overdue) > 1:
+            # Only the most urgent of the already-passed thresholds is worth announcing
+            self._fired.update(overdue[:-1])
+            pending = [lead for lead in pending if lead not in self._fired]
+
+        for lead in pending:
+            when = max(self._cleaning_start - lead, earliest)
+            self._unsubs[lead] = async_track_point_in_time(
+                self.hass, partial(self._async_fire, lead), when
+            )
+        self._armed = True
+
+    @callback
+    def async_cancel(self) -> None:
+        """Cancel pending timers; the current session and its fired alerts are kept."""
+        for unsub in self._unsubs.values():
+            unsub()
+        self._unsubs.clear()
+        self._armed = False
+
+    @callback
+    def _async_fire(self, lead: timedelta, _now: datetime) -> None:
+        self._unsubs.pop(lead, None)
+        if lead in self._fired:
+            return
+        self._fired.add(lead)
+        minutes_until = (self._cleaning_start - dt_util.utcnow()).total_seconds() / 60
+        _LOGGER.debug("Street cleaning: alert %s before cleaning for %s", lead, self._session)
+        self.hass.bus.async_fire(
+            EVENT_ALERT,
+            {
+                **self._data,
+                "threshold_minutes": int(lead.total_seconds() // 60),
+                "minutes_until": round(minutes_until),
+                "next_cleaning_start": self._cleaning_start.isoformat(),
+            },
+        )
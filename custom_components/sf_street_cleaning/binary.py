@@ -0,0 +1,175 @@
+"""Versioned binary snapshots of compiled segment stores for SF Street Cleaning."""
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+from array import array
+
+from .geometry import SegmentStore, np
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"SFSC"
+FORMAT_VERSION = 2
+# magic, format version, header length
+PREAMBLE = struct.Struct("<4sHI")
+
+FLOAT_COLUMNS = (
+    "lon1", "lat1", "lon2", "lat2", "bearing", "m_per_deg_lon",
+    "x1", "y1", "ux", "uy", "length",
+)
+INT_COLUMNS = ("prop_id", "cell_start", "cell_segments")
+
+
+class _Rows:
+    """
+    Properties rows stored as JSON in the mapped file, decoded on first access.
+    Each row is [properties, {side: [offset, count]}], where the offsets point
+    into the shared schedule start/end columns.
+    """
+
+    def __init__(self, offsets, blob, sched_starts, sched_ends):
+        self._offsets = offsets
+        self._blob = blob
+        self._sched_starts = sched_starts
+        self._sched_ends = sched_ends
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def row(self, i):
+        decoded = self._decoded.get(i)
+        if decoded is None:
+            if not 0 <= i < len(self):
+                raise IndexError(i)
+            props, sides = json.loads(bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]))
+            schedules = {
+                side: (self._sched_starts[offset:offset + count], self._sched_ends[offset:offset + count])
+                for side, (offset, count) in sides.items()
+            }
+            decoded = self._decoded[i] = (props, schedules)
+        return decoded
+
+
+class _RowView:
+    """Read-only sequence over one field of _Rows (0 = properties, 1 = schedules)."""
+
+    def __init__(self, rows, field):
+        self._rows = rows
+        self._field = field
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        return self._rows.row(i)[self._field]
+
+
+def _int_array(values):
+    """Fixed 64-bit layout regardless of the platform's array('l') width."""
+    return values if values.typecode == "q" else array("q", values)
+
+
+def export_segments(store: SegmentStore, path: str, source: str) -> None:
+    """
+    Write store (segment table, grid index and schedule timelines) to path.
+    `source` identifies the GeoJSON it was compiled from (its SHA-1), so a
+    stale snapshot is never loaded. Written atomically; runs in the executor.
+    """
+    sched_starts, sched_ends = array("q"), array("q")
+    offsets, blob = array("q", [0]), bytearray()
+    for props, schedules in zip(store.properties, store.schedules):
+        sides = {}
+        for side, (starts, ends) in schedules.items():
+            sides[side] = [len(sched_starts), len(starts)]
+            sched_starts.extend(starts)
+            sched_ends.extend(ends)
+        blob += json.dumps([props, sides], separators=(",", ":"), default=str).encode()
+        offsets.append(len(blob))
+
+    sections = [(name, getattr(store, name)) for name in FLOAT_COLUMNS]
+    sections += [(name, _int_array(getattr(store, name))) for name in INT_COLUMNS]
+    sections += [("sched_starts", sched_starts), ("sched_ends", sched_ends), ("row_offsets", offsets)]
+
+    layout = {}
+    position = 0
+    for name, values in sections:
+        layout[name] = [position, len(values), values.typecode]
+        position += len(values) * values.itemsize
+    layout["rows"] = [position, len(blob), "B"]
+    header = json.dumps({
+        "source": source,
+        "segments": len(store),
+        "cell_size": store.cell_size,
+        "bounds": store.bounds,
+        "min_cell_meters": store._min_cell_meters,
+        "origin": store.origin,
+        "sections": layout,
+    }).encode()
+    # Sections start 8-byte aligned so they can be cast in place
+    pad = -(PREAMBLE.size + len(header)) % 8
+    header += b" " * pad
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        fh.write(header)
+        for _, values in sections:
+            fh.write(values.tobytes())
+        fh.write(blob)
+    # Stores still mapping the old file keep their (unlinked) copy
+    os.replace(tmp_path, path)
+
+
+def load_segments(path: str, source: str | None = None) -> SegmentStore | None:
+    """
+    Memory-map a snapshot written by export_segments. Columns are zero-copy
+    views into the mapping and properties rows are decoded on first use, so
+    only the pages a lookup touches are read. Returns None if the file is
+    missing, from another format version, or not compiled from `source`.
+    """
+    try:
+        with open(path, "rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    view = memoryview(mapped)
+    try:
+        magic, version, header_len = PREAMBLE.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            _LOGGER.debug("Street cleaning: ignoring snapshot %s (format %s)", path, version)
+            return None
+        header = json.loads(bytes(view[PREAMBLE.size:PREAMBLE.size + header_len]))
+    except (struct.error, ValueError):
+        return None
+    if source is not None and header.get("source") != source:
+        return None
+
+    base = PREAMBLE.size + header_len
+    sections = {}
+    for name, (offset, length, typecode) in header["sections"].items():
+        chunk = view[base + offset:base + offset + length * struct.calcsize(typecode)]
+        sections[name] = chunk if typecode == "B" else chunk.cast(typecode)
+
+    store = SegmentStore()
+    for name in FLOAT_COLUMNS + INT_COLUMNS:
+        setattr(store, name, sections[name])
+    rows = _Rows(sections["row_offsets"], sections["rows"], sections["sched_starts"], sections["sched_ends"])
+    store.properties = _RowView(rows, 0)
+    store.schedules = _RowView(rows, 1)
+    store.cell_size = header["cell_size"]
+    store.bounds = tuple(header["bounds"]) if header["bounds"] is not None else None
+    store._min_cell_meters = header["min_cell_meters"]
+    store.origin = tuple(header["origin"])
+    store.source = header.get("source")
+    # The views (and the NumPy arrays over them) keep the mapping alive
+    store._mmap = mapped
+    if np is not None and store.bounds is not None:
+        store.numpy_columns()
+    return store
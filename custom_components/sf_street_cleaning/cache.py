@@ -0,0 +1,315 @@
+"""In-memory and on-disk caches of GeoJSON datasets for SF Street Cleaning."""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import STORAGE_DIR, Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    GEOJSON_REFRESH_INTERVAL_HOURS,
+    NEIGHBORHOOD_FILE_URL_TEMPLATE,
+    SEGMENT_CACHE_MAX_ENTRIES,
+    SEGMENT_CACHE_MAX_SEGMENTS,
+)
+from .binary import export_segments, load_segments
+from .geometry import (
+    NeighborhoodIndex,
+    SegmentStore,
+    compile_neighborhoods,
+    compile_segments,
+    merge_segment_stores,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.http_cache"
+STORAGE_VERSION = 1
+SAVE_DELAY_SECONDS = 10
+# Compressed snapshots shipped with release builds (see scripts/build_snapshot.py)
+BUNDLED_DIR = os.path.join(os.path.dirname(__file__), "snapshots")
+BUNDLED_INDEX = "neighborhoods.geojson.gz"
+
+
+class SegmentCache:
+    """
+    In-memory LRU of compiled SegmentStores keyed by GeoJSON URL. Each entry
+    carries its own fetch time so it expires independently (None, for data of
+    unknown age such as a bundled snapshot, is already expired); eviction keeps
+    both the number of datasets and their total segment count bounded.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SEGMENT_CACHE_MAX_ENTRIES,
+        max_segments: int = SEGMENT_CACHE_MAX_SEGMENTS,
+        ttl: timedelta = timedelta(hours=GEOJSON_REFRESH_INTERVAL_HOURS),
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_segments = max_segments
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[SegmentStore, datetime | None]] = OrderedDict()
+        self._total_segments = 0
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, url: str) -> SegmentStore | None:
+        """Return the cached segments for url (fresh or not) and mark them recently used."""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        self._entries.move_to_end(url)
+        return entry[0]
+
+    def is_fresh(self, url: str, now: datetime) -> bool:
+        entry = self._entries.get(url)
+        return entry is not None and entry[1] is not None and (now - entry[1]) <= self.ttl
+
+    def put(self, url: str, segments: SegmentStore, fetched_at: datetime | None) -> None:
+        if url in self._entries:
+            self._total_segments -= len(self._entries.pop(url)[0])
+        self._entries[url] = (segments, fetched_at)
+        self._total_segments += len(segments)
+        # Evict least recently used datasets, but never the one just added
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._total_segments > self.max_segments
+        ):
+            evicted_url, (evicted, _) = self._entries.popitem(last=False)
+            self._total_segments -= len(evicted)
+            _LOGGER.debug("Street cleaning: evicted %s from segment cache", evicted_url)
+
+    def touch(self, url: str, now: datetime) -> None:
+        """Restart the TTL of url after upstream confirmed it is unchanged."""
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries[url] = (entry[0], now)
+            self._entries.move_to_end(url)
+
+    def urls(self) -> list[str]:
+        return list(self._entries)
+
+    def values(self) -> list[SegmentStore]:
+        return [segments for segments, _ in self._entries.values()]
+
+
+class GeoJSONCache:
+    """
+    Persists downloaded GeoJSON bodies under .storage/sf_street_cleaning/ and
+    their HTTP validators (ETag / Last-Modified) in a Home Assistant Store, so
+    refreshes can be conditional requests. Next to each body sits a compiled
+    binary snapshot (see binary.py) tagged with the body's SHA-1; the GeoJSON
+    stays the source of truth.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._dir = hass.config.path(STORAGE_DIR, DOMAIN)
+        self._entries: dict[str, dict] | None = None
+
+    async def _async_entries(self) -> dict[str, dict]:
+        if self._entries is None:
+            self._entries = await self._store.async_load() or {}
+        return self._entries
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self._dir, hashlib.sha1(url.encode()).hexdigest() + ".geojson")
+
+    def compiled_path(self, url: str) -> str:
+        return os.path.join(self._dir, hashlib.sha1(url.encode()).hexdigest() + ".bin")
+
+    async def async_load_compiled(self, url: str) -> SegmentStore | None:
+        """Memory-map the compiled snapshot for url if it matches the cached body."""
+        entry = (await self._async_entries()).get(url)
+        if not entry or not entry.get("sha1"):
+            return None
+        return await self.hass.async_add_executor_job(load_segments, self.compiled_path(url), entry["sha1"])
+
+    async def async_get_fetched_at(self, url: str) -> datetime | None:
+        """When upstream last served or confirmed the cached body for url, if known."""
+        entry = (await self._async_entries()).get(url)
+        if not entry or not entry.get("fetched_at"):
+            return None
+        return dt_util.parse_datetime(entry["fetched_at"])
+
+    async def async_get_digest(self, url: str) -> str | None:
+        """SHA-1 of the data last compiled for url, if known."""
+        entry = (await self._async_entries()).get(url)
+        return entry.get("sha1") if entry else None
+
+    async def async_load_bundled(self, url: str) -> SegmentStore | None:
+        """
+        Install the snapshot bundled with the integration for url (if any) into
+        the compiled cache and map it, so a fresh install works offline.
+        """
+        name = bundled_name(url)
+        if name is None:
+            return None
+        segments = await self.hass.async_add_executor_job(
+            _install_bundled, os.path.join(BUNDLED_DIR, name), self.compiled_path(url)
+        )
+        if segments is not None and segments.source:
+            await self.async_set_digest(url, segments.source)
+        return segments
+
+    async def async_read_bundled_index(self) -> bytes | None:
+        """The neighborhoods index bundled with the integration, if any."""
+        return await self.hass.async_add_executor_job(_read_gzip, os.path.join(BUNDLED_DIR, BUNDLED_INDEX))
+
+    async def async_set_digest(self, url: str, digest: str) -> None:
+        """Record the SHA-1 of the data compiled for url (ties it to its snapshot)."""
+        entry = (await self._async_entries()).setdefault(url, {})
+        if entry.get("sha1") != digest:
+            entry["sha1"] = digest
+            self._store.async_delay_save(lambda: self._entries, SAVE_DELAY_SECONDS)
+
+    async def async_read(self, url: str) -> bytes | None:
+        """Return the cached body for url, or None if nothing is on disk."""
+        entries = await self._async_entries()
+        if url not in entries:
+            return None
+        return await self.hass.async_add_executor_job(_read_file, self._path(url))
+
+    async def async_fetch(self, url: str) -> bytes | None:
+        """
+        Download url, revalidating against the cached copy when there is one.
+        Returns the new body, or None when upstream answered 304 Not Modified.
+        """
+        entries = await self._async_entries()
+        path = self._path(url)
+        headers = {}
+        entry = entries.get(url)
+        # Only ask for a 304 if we can still serve the body from disk
+        if entry and await self.hass.async_add_executor_job(os.path.exists, path):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        session = async_get_clientsession(self.hass)
+        async with session.get(url, headers=headers) as resp:
+            if resp.status == 304:
+                _LOGGER.debug("Street cleaning: %s not modified", url)
+                if entry:
+                    entry["fetched_at"] = dt_util.utcnow().isoformat()
+                    self._store.async_delay_save(lambda: self._entries, SAVE_DELAY_SECONDS)
+                return None
+            resp.raise_for_status()
+            body = await resp.read()
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+
+        await self.hass.async_add_executor_job(_write_file, path, body)
+        entries[url] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": dt_util.utcnow().isoformat(),
+            # Until the new body compiles, the previous snapshot stays usable
+            "sha1": entry.get("sha1") if entry else None,
+        }
+        self._store.async_delay_save(lambda: self._entries, SAVE_DELAY_SECONDS)
+        return body
+
+
+def bundled_name(url: str) -> str | None:
+    """File name of the bundled snapshot for a neighborhood URL, else None."""
+    prefix, suffix = NEIGHBORHOOD_FILE_URL_TEMPLATE.split("{file}")
+    if url.startswith(prefix) and url.endswith(suffix):
+        return url[len(prefix):len(url) - len(suffix)] + ".bin.gz"
+    return None
+
+
+def _read_gzip(path: str) -> bytes | None:
+    try:
+        with gzip.open(path, "rb") as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def _install_bundled(bundled_path: str, path: str) -> SegmentStore | None:
+    data = _read_gzip(bundled_path)
+    if data is None:
+        return None
+    _write_file(path, data)
+    return load_segments(path)
+
+
+def body_digest(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+
+def _read_file(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_file(path: str, body: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(body)
+    os.replace(tmp_path, path)
+
+
+def parse_and_compile_segments(body: bytes) -> SegmentStore:
+    """Decode a GeoJSON body and compile it; runs in the executor."""
+    return compile_segments(json_loads(body))
+
+
+def compile_and_export_segments(body: bytes, path: str) -> tuple[SegmentStore, str]:
+    """
+    parse_and_compile_segments plus a binary snapshot at path for faster
+    restarts; returns the store and the body's SHA-1. Runs in the executor.
+    """
+    segments = parse_and_compile_segments(body)
+    digest = segments.source = body_digest(body)
+    try:
+        export_segments(segments, path, digest)
+    except OSError as err:
+        _LOGGER.warning("Street cleaning: could not write compiled snapshot %s (%s)", path, err)
+    return segments, digest
+
+
+def merge_and_export_segments(stores: list[SegmentStore], path: str, digest: str) -> SegmentStore:
+    """
+    Merge compiled stores into one index and snapshot it at path; runs in the
+    executor. Returns the memory-mapped snapshot rather than the merged store,
+    whose decoded properties rows would otherwise stay resident.
+    """
+    segments = merge_segment_stores(stores)
+    try:
+        export_segments(segments, path, digest)
+    except OSError as err:
+        _LOGGER.warning("Street cleaning: could not write compiled snapshot %s (%s)", path, err)
+    else:
+        mapped = load_segments(path, digest)
+        if mapped is not None:
+            return mapped
+    segments.source = digest
+    return segments
+
+
+def parse_and_compile_neighborhoods(body: bytes) -> NeighborhoodIndex:
+    """Decode the neighborhoods index and compile its polygons; runs in the executor."""
+    return compile_neighborhoods(json_loads(body))
@@ -11,7 +11,19 @@ from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import selector
 
-from .const import DOMAIN, CONF_DEVICE_TRACKER, GEOJSON_URL
+from .const import (
+    DOMAIN,
+    CONF_DEVICE_TRACKER,
+    CONF_MIN_MOVE_METERS,
+    CONF_DISTANCE_RESOLUTION,
+    CONF_HOURS_RESOLUTION,
+    CONF_ALERT_LEAD_TIMES,
+    CONF_CITYWIDE,
+    DEFAULT_MIN_MOVE_METERS,
+    DEFAULT_DISTANCE_RESOLUTION,
+    DEFAULT_HOURS_RESOLUTION,
+    DEFAULT_ALERT_LEAD_TIMES,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,9 +32,37 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
         vol.Required(CONF_DEVICE_TRACKER): selector.EntitySelector(
             selector.EntitySelectorConfig(domain="device_tracker")
         ),
-        vol.Optional("geojson_url", default=None): selector.TextSelector(
+        # Leave empty to follow the tracker across neighborhoods
+        vol.Optional("geojson_url"): selector.TextSelector(
             selector.TextSelectorConfig(type=selector.TextSelectorType.URL)
         ),
+        # Load every neighborhood into one index instead of a single file
+        vol.Optional(CONF_CITYWIDE, default=False): selector.BooleanSelector(),
+        vol.Optional(CONF_MIN_MOVE_METERS, default=DEFAULT_MIN_MOVE_METERS): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0, max=100, step=1, unit_of_measurement="m", mode=selector.NumberSelectorMode.BOX
+            )
+        ),
+        vol.Optional(CONF_DISTANCE_RESOLUTION, default=DEFAULT_DISTANCE_RESOLUTION): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0, max=25, step=0.5, unit_of_measurement="m", mode=selector.NumberSelectorMode.BOX
+            )
+        ),
+        vol.Optional(CONF_HOURS_RESOLUTION, default=DEFAULT_HOURS_RESOLUTION): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0.1, max=24, step=0.1, unit_of_measurement="h", mode=selector.NumberSelectorMode.BOX
+            )
+        ),
+        # Minutes before cleaning; free-form values are allowed
+        vol.Optional(
+            CONF_ALERT_LEAD_TIMES, default=[str(m) for m in DEFAULT_ALERT_LEAD_TIMES]
+        ): selector.SelectSelector(
+            selector.SelectSelectorConfig(
+                options=[str(m) for m in DEFAULT_ALERT_LEAD_TIMES],
+                multiple=True,
+                custom_value=True,
+            )
+        ),
     }
 )
 
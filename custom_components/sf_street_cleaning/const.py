@@ -2,17 +2,54 @@
 
 DOMAIN = "sf_street_cleaning"
 
-# GitHub URL for the neighborhood GeoJSON data
-GEOJSON_URL = "https://raw.githubusercontent.com/kaushalpartani/sf-street-cleaning/refs/heads/main/data/neighborhoods/Marina.geojson"
 GEOJSON_REFRESH_INTERVAL_HOURS = 24
+# Compiled neighborhood datasets kept in memory (LRU), bounded by count and total segments
+SEGMENT_CACHE_MAX_ENTRIES = 8
+SEGMENT_CACHE_MAX_SEGMENTS = 250_000
+# GitHub URLs for the neighborhood GeoJSON data
 NEIGHBORHOODS_INDEX_URL = "https://raw.githubusercontent.com/kaushalpartani/sf-street-cleaning/refs/heads/main/data/neighborhoods.geojson"
 NEIGHBORHOOD_FILE_URL_TEMPLATE = "https://raw.githubusercontent.com/kaushalpartani/sf-street-cleaning/refs/heads/main/data/neighborhoods/{file}.geojson"
+# Dataset key for every neighborhood merged into one index (citywide mode)
+CITYWIDE_URL = "citywide"
+# Neighborhood files downloaded in parallel when building the citywide dataset
+CITYWIDE_MAX_CONCURRENT_DOWNLOADS = 4
 
 # Configuration Keys
 CONF_DEVICE_TRACKER = "device_tracker_id"
+CONF_MIN_MOVE_METERS = "min_move_meters"
+CONF_DISTANCE_RESOLUTION = "distance_resolution_meters"
+CONF_HOURS_RESOLUTION = "cleaning_in_hours_resolution"
+CONF_ALERT_LEAD_TIMES = "alert_lead_times"
+CONF_CITYWIDE = "citywide"
+
+# Tracker updates closer than this to the last match (same side bucket) reuse it
+DEFAULT_MIN_MOVE_METERS = 5.0
+# distance_to_segment is rounded to this step so GPS jitter does not change the state
+DEFAULT_DISTANCE_RESOLUTION = 1.0
+# cleaning_in_hours is rounded to this step (hours) until the final fine window,
+# so a parked car does not write (and record) a new state every few minutes
+DEFAULT_HOURS_RESOLUTION = 1.0
+# Within this many hours of cleaning, cleaning_in_hours uses the fine step instead
+CLEANING_IN_HOURS_FINE_WINDOW = 3.0
+CLEANING_IN_HOURS_FINE_STEP = 0.1
+
+# Sweeping is assumed to last this long when the schedule has no end time
+CLEANING_DURATION_HOURS = 2.0
+# Within this many hours of the next cleaning the sensor reports "Warning"
+WARNING_HOURS = 24.0
 
 # Events
 EVENT_ALERT = "sf_street_cleaning_alert"
+# Minutes before cleaning at which EVENT_ALERT fires (24h, 2h, 60/30/10 min)
+DEFAULT_ALERT_LEAD_TIMES = [1440, 120, 60, 30, 10]
+# The vehicle must stay on the same street side this long before alerts fire
+ALERT_SETTLE_SECONDS = 120
+
+# Sensor states
+STATE_LOADING = "Loading"
+
+# Services
+SERVICE_LOOKUP = "lookup"
 
 # Attributes
 ATTR_STREET = "street"
@@ -0,0 +1,371 @@
+"""Shared data coordinator for the SF Street Cleaning integration."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from collections.abc import Awaitable, Callable, Mapping
+from datetime import datetime, timedelta
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .cache import (
+    GeoJSONCache,
+    SegmentCache,
+    body_digest,
+    compile_and_export_segments,
+    merge_and_export_segments,
+    parse_and_compile_neighborhoods,
+)
+from .const import (
+    CITYWIDE_MAX_CONCURRENT_DOWNLOADS,
+    CITYWIDE_URL,
+    CONF_CITYWIDE,
+    DOMAIN,
+    GEOJSON_REFRESH_INTERVAL_HOURS,
+    NEIGHBORHOOD_FILE_URL_TEMPLATE,
+    NEIGHBORHOODS_INDEX_URL,
+)
+from .geometry import NeighborhoodIndex, SegmentStore
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StreetCleaningCoordinator:
+    """
+    Owns every street cleaning dataset for the integration: the on-disk GeoJSON
+    cache, the in-memory LRU of compiled segment stores, the neighborhoods index
+    and the refresh schedule. Sensors ask it for the dataset they need and
+    subscribe with async_add_listener; listeners are called with the URL whose
+    segments changed. Concurrent requests for the same URL share one download.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self.disk_cache = GeoJSONCache(hass)
+        self.segment_cache = SegmentCache()
+        self.neighborhoods: NeighborhoodIndex | None = None
+        self._listeners: list[Callable[[str], None]] = []
+        self._entries = 0
+        self._unsub_refresh: CALLBACK_TYPE | None = None
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[str], None]) -> CALLBACK_TYPE:
+        """Subscribe to dataset changes; returns the unsubscribe callback."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def _async_notify(self, url: str) -> None:
+        for update_callback in list(self._listeners):
+            update_callback(url)
+
+    async def _async_single_flight(self, key: str, factory: Callable[[], Awaitable]):
+        """
+        Run factory() once for concurrent callers with the same key; everyone
+        awaits the same task. The task is shielded so one caller being
+        cancelled does not cancel the download for the others.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            _LOGGER.debug("Street cleaning: joining in-flight request for %s", key)
+        return await asyncio.shield(task)
+
+    @callback
+    def async_register_entry(self) -> CALLBACK_TYPE:
+        """Start the shared refresh schedule for a config entry; returns its release callback."""
+        self._entries += 1
+        if self._unsub_refresh is None:
+            self._unsub_refresh = async_track_time_interval(
+                self.hass,
+                self._async_scheduled_refresh,
+                timedelta(hours=GEOJSON_REFRESH_INTERVAL_HOURS),
+            )
+
+        @callback
+        def release() -> None:
+            self._entries -= 1
+            if not self._entries and self._unsub_refresh is not None:
+                self._unsub_refresh()
+                self._unsub_refresh = None
+
+        return release
+
+    async def _async_scheduled_refresh(self, _now=None) -> None:
+        """Revalidate every dataset currently held in memory."""
+        for url in self.segment_cache.urls():
+            try:
+                await self.async_refresh_segments(url)
+            except Exception as err:
+                _LOGGER.warning("Street cleaning: scheduled refresh of %s failed (%s)", url, err)
+
+    def segments(self, url: str) -> SegmentStore | None:
+        """Compiled segments for url if loaded (fresh or not)."""
+        return self.segment_cache.get(url)
+
+    async def async_get_segments(self, url: str) -> SegmentStore | None:
+        """
+        Segments for url: a cache hit while fresh, otherwise a (conditional)
+        refresh. A URL not yet in memory is first loaded from disk or the
+        bundled snapshots, so the refresh can be a 304 and a failed one still
+        has data. Falls back to an expired copy, or None, if the refresh fails.
+        """
+        if url not in self.segment_cache:
+            try:
+                await self.async_load_cached_segments(url)
+            except Exception as err:
+                _LOGGER.warning("Street cleaning: failed to load cached GeoJSON for %s (%s)", url, err)
+        if self.segment_cache.is_fresh(url, dt_util.utcnow()):
+            return self.segment_cache.get(url)
+        try:
+            _LOGGER.info("Street cleaning: refreshing GeoJSON from %s", url)
+            return await self.async_refresh_segments(url)
+        except Exception as err:
+            _LOGGER.warning("Street cleaning: failed to refresh GeoJSON (%s)", err)
+            return self.segment_cache.get(url)
+
+    async def _async_adopt_segments(self, url: str, body: bytes, fetched_at: datetime | None) -> SegmentStore:
+        """Parse and compile a GeoJSON body off the event loop, then publish it in the segment cache."""
+        segments, digest = await self.hass.async_add_executor_job(
+            compile_and_export_segments, body, self.disk_cache.compiled_path(url)
+        )
+        await self.disk_cache.async_set_digest(url, digest)
+        # Single assignment on the event loop: readers see either the old or the new store
+        self.segment_cache.put(url, segments, fetched_at)
+        _LOGGER.debug("Street cleaning: loaded %d segments from %s", len(segments), url)
+        self._async_notify(url)
+        return segments
+
+    async def async_load_cached_segments(self, url: str) -> SegmentStore | None:
+        """
+        Load segments for url without touching the network: the memory-mapped
+        binary snapshot when it matches the cached GeoJSON, otherwise the
+        GeoJSON itself (re-exporting the snapshot), otherwise the snapshot
+        bundled with the integration. Entries keep the age of the data on disk,
+        so the next async_get_segments revalidates anything past its TTL.
+        """
+        fetched_at = await self.disk_cache.async_get_fetched_at(url)
+        segments = await self.disk_cache.async_load_compiled(url)
+        if segments is not None:
+            self.segment_cache.put(url, segments, fetched_at)
+            _LOGGER.debug("Street cleaning: mapped %d compiled segments for %s", len(segments), url)
+            self._async_notify(url)
+            return segments
+        body = await self.disk_cache.async_read(url)
+        if body is not None:
+            return await self._async_adopt_segments(url, body, fetched_at)
+        # Fresh install or wiped cache: fall back to the snapshot shipped with the integration
+        segments = await self.disk_cache.async_load_bundled(url)
+        if segments is not None:
+            # Unknown age: served at once, revalidated on the next request
+            self.segment_cache.put(url, segments, None)
+            _LOGGER.info("Street cleaning: using bundled snapshot for %s", url)
+            self._async_notify(url)
+        return segments
+
+    async def async_refresh_segments(self, url: str) -> SegmentStore:
+        """
+        Revalidate url against upstream and return its compiled segments. A 304,
+        or a body with the same SHA-1 as the loaded store, keeps that store
+        without re-parsing.
+        """
+        return await self._async_single_flight(url, lambda: self._async_refresh_segments(url))
+
+    async def _async_refresh_segments(self, url: str) -> SegmentStore:
+        if url == CITYWIDE_URL:
+            return await self._async_refresh_citywide()
+        body = await self.disk_cache.async_fetch(url)
+        if body is None:
+            segments = self.segment_cache.get(url)
+            if segments is not None:
+                self.segment_cache.touch(url, dt_util.utcnow())
+                return segments
+            # Evicted from memory: map the snapshot rather than re-parse the body
+            segments = await self.disk_cache.async_load_compiled(url)
+            if segments is not None:
+                self.segment_cache.put(url, segments, dt_util.utcnow())
+                self._async_notify(url)
+                return segments
+            body = await self.disk_cache.async_read(url)
+            if body is None:
+                raise FileNotFoundError(f"cached GeoJSON for {url} is missing")
+            return await self._async_adopt_segments(url, body, dt_util.utcnow())
+
+        # Upstreams without validators resend identical bodies; keep the compiled store
+        segments = self.segment_cache.get(url)
+        if segments is not None and segments.source is not None:
+            digest = await self.hass.async_add_executor_job(body_digest, body)
+            if digest == segments.source:
+                _LOGGER.debug("Street cleaning: %s unchanged (content hash)", url)
+                await self.disk_cache.async_set_digest(url, digest)
+                self.segment_cache.touch(url, dt_util.utcnow())
+                return segments
+        return await self._async_adopt_segments(url, body, dt_util.utcnow())
+
+    async def _async_refresh_citywide(self) -> SegmentStore:
+        """
+        Revalidate every neighborhood file listed in the index (a bounded number
+        of downloads at a time) and merge their compiled stores into one index
+        off the event loop. Only neighborhoods whose content hash changed are
+        re-parsed; the rest come from their snapshots (cached or bundled).
+        """
+        index = await self.async_get_neighborhoods()
+        if not index:
+            raise RuntimeError("neighborhoods index is unavailable")
+        urls = [NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file=name) for name in sorted(set(index.names))]
+        semaphore = asyncio.Semaphore(CITYWIDE_MAX_CONCURRENT_DOWNLOADS)
+        stores = await asyncio.gather(*(self._async_neighborhood_store(url, semaphore) for url in urls))
+
+        members = [(url, store) for url, store in zip(urls, stores) if store is not None]
+        if not members:
+            raise RuntimeError("no neighborhood files could be loaded")
+        if len(members) < len(urls):
+            _LOGGER.warning(
+                "Street cleaning: citywide data is missing %d of %d neighborhoods",
+                len(urls) - len(members),
+                len(urls),
+            )
+        combined = hashlib.sha1()
+        for url, store in members:
+            combined.update(f"{url}\n{store.source}\n".encode())
+        digest = combined.hexdigest()
+
+        segments = self.segment_cache.get(CITYWIDE_URL)
+        if segments is not None and segments.source == digest:
+            self.segment_cache.touch(CITYWIDE_URL, dt_util.utcnow())
+            return segments
+        segments = await self.disk_cache.async_load_compiled(CITYWIDE_URL)
+        if segments is None or segments.source != digest:
+            segments = await self.hass.async_add_executor_job(
+                merge_and_export_segments,
+                [store for _, store in members],
+                self.disk_cache.compiled_path(CITYWIDE_URL),
+                digest,
+            )
+            await self.disk_cache.async_set_digest(CITYWIDE_URL, digest)
+        self.segment_cache.put(CITYWIDE_URL, segments, dt_util.utcnow())
+        _LOGGER.debug("Street cleaning: merged %d segments from %d neighborhoods", len(segments), len(members))
+        self._async_notify(CITYWIDE_URL)
+        return segments
+
+    async def _async_neighborhood_store(self, url: str, semaphore: asyncio.Semaphore) -> SegmentStore | None:
+        """
+        Compiled store of one neighborhood for the citywide merge. A download
+        whose SHA-1 matches what was compiled before reuses that snapshot.
+        """
+        previous = await self.disk_cache.async_get_digest(url)
+        body = None
+        try:
+            async with semaphore:
+                body = await self.disk_cache.async_fetch(url)
+        except Exception as err:
+            _LOGGER.warning("Street cleaning: failed to refresh %s (%s)", url, err)
+
+        if body is not None:
+            digest = await self.hass.async_add_executor_job(body_digest, body)
+            if digest != previous:
+                segments = await self._async_compile_neighborhood(url, body)
+                if segments is not None:
+                    return segments
+
+        segments = await self.disk_cache.async_load_compiled(url)
+        if segments is not None:
+            return segments
+        body = await self.disk_cache.async_read(url)
+        if body is not None:
+            segments = await self._async_compile_neighborhood(url, body)
+            if segments is not None:
+                return segments
+        return await self.disk_cache.async_load_bundled(url)
+
+    async def _async_compile_neighborhood(self, url: str, body: bytes) -> SegmentStore | None:
+        """Compile one neighborhood body and record its digest; None if the body is malformed."""
+        try:
+            segments, digest = await self.hass.async_add_executor_job(
+                compile_and_export_segments, body, self.disk_cache.compiled_path(url)
+            )
+        except Exception as err:
+            _LOGGER.warning("Street cleaning: could not parse %s (%s)", url, err)
+            return None
+        await self.disk_cache.async_set_digest(url, digest)
+        return segments
+
+    async def async_load_segments(self, url: str) -> None:
+        """Warm the segment cache from disk, then revalidate (or download) from upstream."""
+        segments = None
+        try:
+            segments = await self.async_load_cached_segments(url)
+            if segments is not None:
+                _LOGGER.info("Loaded %d cached street segments for %s", len(segments), url)
+        except Exception as err:
+            _LOGGER.warning("Error loading cached GeoJSON data: %s", err)
+
+        try:
+            _LOGGER.info("Fetching SF Street Cleaning GeoJSON from %s", url)
+            segments = await self.async_refresh_segments(url)
+            _LOGGER.info("Successfully loaded %d segments from GeoJSON", len(segments))
+        except Exception as err:
+            if segments is None:
+                # Sensors keep retrying on their poll interval
+                _LOGGER.error("Error fetching/parsing GeoJSON data: %s", err)
+            else:
+                _LOGGER.warning("Error revalidating cached GeoJSON data: %s", err)
+
+    async def async_get_neighborhoods(self) -> NeighborhoodIndex | None:
+        """Neighborhoods index (MultiPolygon per neighborhood), fetched once."""
+        if self.neighborhoods:
+            return self.neighborhoods
+        return await self._async_single_flight(NEIGHBORHOODS_INDEX_URL, self._async_fetch_neighborhoods)
+
+    async def _async_fetch_neighborhoods(self) -> NeighborhoodIndex | None:
+        body = None
+        try:
+            _LOGGER.info("Street cleaning: fetching neighborhoods index from %s", NEIGHBORHOODS_INDEX_URL)
+            body = await self.disk_cache.async_fetch(NEIGHBORHOODS_INDEX_URL)
+        except Exception as err:
+            _LOGGER.warning("Street cleaning: failed to fetch neighborhoods index (%s)", err)
+        try:
+            # Not modified or offline: the cached copy, then the bundled one
+            if body is None:
+                body = await self.disk_cache.async_read(NEIGHBORHOODS_INDEX_URL)
+            if body is None:
+                body = await self.disk_cache.async_read_bundled_index()
+            if body is None:
+                return None
+            # Decoding and polygon compilation stay off the event loop
+            self.neighborhoods = await self.hass.async_add_executor_job(parse_and_compile_neighborhoods, body)
+            return self.neighborhoods
+        except Exception as err:
+            _LOGGER.warning("Street cleaning: failed to load neighborhoods index (%s)", err)
+            return None
+
+
+def dataset_url(data: Mapping) -> str | None:
+    """
+    Dataset a config entry uses: citywide, a custom GeoJSON URL, or None to
+    auto-detect the neighborhood from the tracker's position.
+    """
+    if data.get(CONF_CITYWIDE):
+        return CITYWIDE_URL
+    return data.get("geojson_url") or None
+
+
+@callback
+def async_get_coordinator(hass: HomeAssistant) -> StreetCleaningCoordinator:
+    """Return the integration-wide coordinator, creating it on first use."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if "coordinator" not in data:
+        data["coordinator"] = StreetCleaningCoordinator(hass)
+    return data["coordinator"]
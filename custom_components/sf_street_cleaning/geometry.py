@@ -1,4 +1,15 @@
+import itertools
+import json
 import math
+from array import array
+from collections import OrderedDict
+
+from .schedule import compile_side_schedule
+
+try:
+    import numpy as np
+except ImportError:  # Home Assistant ships NumPy, but keep the pure-Python path working
+    np = None
 
 def distance_point_to_segment_meters(px, py, x1, y1, x2, y2):
     """
@@ -59,43 +70,624 @@ def get_bearing(lat1, lon1, lat2, lon2):
     bearing = math.degrees(math.atan2(y, x))
     return (bearing + 360) % 360
 
-def find_cleaning_data(geojson, lat, lon, rotation):
+# Uniform grid cell size in degrees (~111m N-S, ~88m E-W in San Francisco)
+GRID_CELL_DEGREES = 0.001
+# Upper bound on dense grid size; cells are enlarged for unusually wide datasets
+MAX_GRID_CELLS = 250_000
+METERS_PER_DEG_LAT = 111139.0
+# Query rows per broadcast distance matrix in nearest_batch
+BATCH_CHUNK_SIZE = 1024
+# Queries per grid cell, on average, below which nearest_batch answers point by point
+BATCH_MIN_GROUP_SIZE = 2
+# Lookup memo: coordinates rounded to 5 decimals (~1 m) and at most this many entries
+LOOKUP_CACHE_DECIMALS = 5
+LOOKUP_CACHE_SIZE = 256
+
+# Every SegmentStore gets a distinct version, so memoized lookups never outlive their dataset
+_store_versions = itertools.count(1)
+
+
+class SegmentStore:
     """
-    Finds the closest street segment and determines the side.
-    Returns a dictionary with street info or None.
+    Compact, array-backed table of street segments compiled from a GeoJSON
+    FeatureCollection (see compile_segments). Each segment row holds its
+    endpoints, bearing, metres-per-degree-longitude factor and an index into a
+    de-duplicated properties table, whose per-side cleaning schedules are
+    precompiled into timelines (see schedule.compile_side_schedule). A uniform grid in CSR layout (cell_start,
+    cell_segments) lets nearest() visit only the cells around the query point.
+    Segments are also pre-projected into metres around `origin` (start point,
+    unit direction and length; see _project), so distance queries are
+    multiply-adds only.
     """
-    if not geojson or 'features' not in geojson:
+
+    def __init__(self):
+        self.lon1 = array('d')
+        self.lat1 = array('d')
+        self.lon2 = array('d')
+        self.lat2 = array('d')
+        self.bearing = array('d')
+        self.m_per_deg_lon = array('d')
+        self.prop_id = array('l')
+        # Planar projection: start point in metres from origin, unit direction, length in metres
+        self.origin = (0.0, 0.0)  # (lon, lat) of the projection origin
+        self.x1 = array('d')
+        self.y1 = array('d')
+        self.ux = array('d')
+        self.uy = array('d')
+        self.length = array('d')
+        self.properties = []
+        self.schedules = []  # per properties row: {side: (starts, ends)}
+
+        self.cell_size = GRID_CELL_DEGREES
+        self.bounds = None  # (min_cx, min_cy, max_cx, max_cy) in cell coordinates
+        self.cell_start = array('l')
+        self.cell_segments = array('l')
+        self._min_cell_meters = 0.0
+        self._np_columns = None
+        self._mmap = None  # set when the columns are views into a binary snapshot
+        self.source = None  # digest of the data a snapshot was compiled from
+        self.version = next(_store_versions)
+
+    def __len__(self):
+        return len(self.lon1)
+
+    def _cell(self, value):
+        return math.floor(value / self.cell_size)
+
+    def _build_grid(self):
+        """Buckets every segment into the cells its bounding box overlaps."""
+        n = len(self)
+        if not n:
+            return
+        min_lon = min(min(self.lon1), min(self.lon2))
+        max_lon = max(max(self.lon1), max(self.lon2))
+        min_lat = min(min(self.lat1), min(self.lat2))
+        max_lat = max(max(self.lat1), max(self.lat2))
+        area = (max_lon - min_lon) * (max_lat - min_lat)
+        self.cell_size = max(GRID_CELL_DEGREES, math.sqrt(area / MAX_GRID_CELLS))
+
+        min_cx, max_cx = self._cell(min_lon), self._cell(max_lon)
+        min_cy, max_cy = self._cell(min_lat), self._cell(max_lat)
+        self.bounds = (min_cx, min_cy, max_cx, max_cy)
+        width = max_cx - min_cx + 1
+        height = max_cy - min_cy + 1
+
+        spans = []
+        counts = array('l', [0]) * (width * height + 1)
+        for i in range(n):
+            cx1, cx2 = sorted((self._cell(self.lon1[i]), self._cell(self.lon2[i])))
+            cy1, cy2 = sorted((self._cell(self.lat1[i]), self._cell(self.lat2[i])))
+            spans.append((cx1 - min_cx, cx2 - min_cx, cy1 - min_cy, cy2 - min_cy))
+            for cy in range(cy1 - min_cy, cy2 - min_cy + 1):
+                row = cy * width
+                for cx in range(cx1 - min_cx, cx2 - min_cx + 1):
+                    counts[row + cx + 1] += 1
+
+        for c in range(1, len(counts)):
+            counts[c] += counts[c - 1]
+        self.cell_start = counts
+        fill = array('l', counts)
+        self.cell_segments = array('l', [0]) * counts[-1]
+        for i, (x1, x2, y1, y2) in enumerate(spans):
+            for cy in range(y1, y2 + 1):
+                row = cy * width
+                for cx in range(x1, x2 + 1):
+                    slot = row + cx
+                    self.cell_segments[fill[slot]] = i
+                    fill[slot] += 1
+
+        # Smallest metres-per-cell across the grid, so ring distances are a safe lower bound
+        max_abs_lat = max(abs(min_lat), abs(max_lat))
+        self._min_cell_meters = self.cell_size * METERS_PER_DEG_LAT * math.cos(math.radians(min(max_abs_lat, 89.9)))
+        self.origin = ((min_lon + max_lon) / 2.0, (min_lat + max_lat) / 2.0)
+
+    def _project(self):
+        """
+        Projects every segment into metres around `origin`. Longitudes keep
+        each segment's own metres-per-degree factor, so distances are the same
+        as distance_point_to_segment_meters without any trig or division at
+        query time.
+        """
+        lon0, lat0 = self.origin
+        x1, y1, ux, uy, length = (array('d') for _ in range(5))
+        for i in range(len(self)):
+            m_lon = self.m_per_deg_lon[i]
+            ax = (self.lon1[i] - lon0) * m_lon
+            ay = (self.lat1[i] - lat0) * METERS_PER_DEG_LAT
+            dx = (self.lon2[i] - lon0) * m_lon - ax
+            dy = (self.lat2[i] - lat0) * METERS_PER_DEG_LAT - ay
+            seg_len = math.sqrt(dx * dx + dy * dy)
+            x1.append(ax)
+            y1.append(ay)
+            # Zero-length segments keep a zero direction and project onto their start point
+            ux.append(dx / seg_len if seg_len else 0.0)
+            uy.append(dy / seg_len if seg_len else 0.0)
+            length.append(seg_len)
+        self.x1, self.y1, self.ux, self.uy, self.length = x1, y1, ux, uy, length
+
+    def project(self, lat, lon):
+        """
+        Query point in the store's frame: (longitude offset in degrees, y in
+        metres). The offset is scaled per segment by m_per_deg_lon. Works
+        element-wise on NumPy arrays.
+        """
+        lon0, lat0 = self.origin
+        return lon - lon0, (lat - lat0) * METERS_PER_DEG_LAT
+
+    def _cell_members(self, cx, cy):
+        min_cx, min_cy, max_cx, _ = self.bounds
+        slot = (cy - min_cy) * (max_cx - min_cx + 1) + (cx - min_cx)
+        return self.cell_segments[self.cell_start[slot]:self.cell_start[slot + 1]]
+
+    def _ring_cells(self, qx, qy, ring):
+        """Yields the cells at Chebyshev distance `ring` from (qx, qy), clipped to the grid."""
+        min_x, min_y, max_x, max_y = self.bounds
+        if ring == 0:
+            if min_x <= qx <= max_x and min_y <= qy <= max_y:
+                yield (qx, qy)
+            return
+        x_lo, x_hi = max(qx - ring, min_x), min(qx + ring, max_x)
+        for y in (qy - ring, qy + ring):
+            if min_y <= y <= max_y:
+                for x in range(x_lo, x_hi + 1):
+                    yield (x, y)
+        y_lo, y_hi = max(qy - ring + 1, min_y), min(qy + ring - 1, max_y)
+        for x in (qx - ring, qx + ring):
+            if min_x <= x <= max_x:
+                for y in range(y_lo, y_hi + 1):
+                    yield (x, y)
+
+    def segment_distance(self, i, lat, lon):
+        """Distance in metres from (lat, lon) to segment row i."""
+        dlon, qy = self.project(lat, lon)
+        return self._projected_distance(i, dlon, qy)
+
+    def _projected_distance(self, i, dlon, qy):
+        """segment_distance for a query already passed through project()."""
+        ax = dlon * self.m_per_deg_lon[i] - self.x1[i]
+        ay = qy - self.y1[i]
+        ux = self.ux[i]
+        uy = self.uy[i]
+        t = ax * ux + ay * uy
+        if t < 0.0:
+            t = 0.0
+        elif t > self.length[i]:
+            t = self.length[i]
+        ex = ax - t * ux
+        ey = ay - t * uy
+        return math.sqrt(ex * ex + ey * ey)
+
+    def nearest(self, lat, lon):
+        """
+        Returns (segment_id, distance_m) of the segment closest to (lat, lon),
+        or None if the store is empty.
+        """
+        if self.bounds is None:
+            return None
+        if np is not None:
+            return self._nearest_vectorized(lat, lon)
+        return self._nearest_scalar(lat, lon)
+
+    def nearest_batch(self, lats, lons):
+        """
+        Nearest segment for many points at once; returns a list of
+        (segment_id, distance_m) or None, aligned with the inputs.
+        """
+        n = len(lats)
+        if self.bounds is None:
+            return [None] * n
+        if np is None:
+            return [self._nearest_scalar(lat, lon) for lat, lon in zip(lats, lons)]
+
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        results = [None] * n
+        # Group queries by grid cell so each group shares one candidate window
+        cells = np.stack((np.floor(lons / self.cell_size), np.floor(lats / self.cell_size)), axis=1).astype(np.int64)
+        keys, inverse, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+        if len(keys) * BATCH_MIN_GROUP_SIZE > n:
+            # Scattered points (a fleet rather than one trace) share no windows worth grouping
+            return [self._nearest_vectorized(lat, lon) for lat, lon in zip(lats.tolist(), lons.tolist())]
+        order = np.argsort(inverse.ravel(), kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+
+        for group, (qx, qy) in enumerate(keys.tolist()):
+            members = order[offsets[group]:offsets[group + 1]]
+            ids = self._window_ids(qx, qy, 1)
+            if ids is None:
+                pending = members
+            else:
+                pending = []
+                for chunk_start in range(0, len(members), BATCH_CHUNK_SIZE):
+                    chunk = members[chunk_start:chunk_start + BATCH_CHUNK_SIZE]
+                    dists = segment_distances(self, ids, lats[chunk, None], lons[chunk, None])
+                    best = dists.argmin(axis=1)
+                    best_dists = dists[np.arange(len(chunk)), best]
+                    for q, seg, dist in zip(chunk.tolist(), ids[best].tolist(), best_dists.tolist()):
+                        # Same bound as _nearest_vectorized for a radius-1 window
+                        if dist < self._min_cell_meters:
+                            results[q] = (seg, dist)
+                        else:
+                            pending.append(q)
+            for q in pending:
+                results[q] = self._nearest_vectorized(float(lats[q]), float(lons[q]))
+        return results
+
+    def numpy_columns(self):
+        """Zero-copy NumPy views of (x1, y1, ux, uy, length, m_per_deg_lon, cell_start, cell_segments)."""
+        if self._np_columns is None:
+            self._np_columns = (
+                np.frombuffer(self.x1, dtype=np.float64),
+                np.frombuffer(self.y1, dtype=np.float64),
+                np.frombuffer(self.ux, dtype=np.float64),
+                np.frombuffer(self.uy, dtype=np.float64),
+                np.frombuffer(self.length, dtype=np.float64),
+                np.frombuffer(self.m_per_deg_lon, dtype=np.float64),
+                np.asarray(self.cell_start, dtype=np.intp),
+                np.asarray(self.cell_segments, dtype=np.intp),
+            )
+        return self._np_columns
+
+    def _window_ids(self, qx, qy, radius):
+        """NumPy array of segment ids bucketed in the (2*radius+1)^2 cells around (qx, qy)."""
+        min_x, min_y, max_x, max_y = self.bounds
+        width = max_x - min_x + 1
+        cell_start, cell_segments = self.numpy_columns()[6:]
+        x_lo = max(qx - radius, min_x) - min_x
+        x_hi = min(qx + radius, max_x) - min_x
+        if x_lo > x_hi:
+            return None
+        # Each grid row of the window is one contiguous run in the CSR table
+        slices = []
+        for y in range(max(qy - radius, min_y) - min_y, min(qy + radius, max_y) - min_y + 1):
+            begin = cell_start[y * width + x_lo]
+            end = cell_start[y * width + x_hi + 1]
+            if end > begin:
+                slices.append(cell_segments[begin:end])
+        if not slices:
+            return None
+        # Sorted and de-duplicated, so argmin ties resolve to the lowest segment id
+        return np.unique(np.concatenate(slices))
+
+    def _nearest_vectorized(self, lat, lon):
+        """Grid search over square windows that double in size; each window is one batched kernel call."""
+        min_x, min_y, max_x, max_y = self.bounds
+        qx, qy = self._cell(lon), self._cell(lat)
+        radius = max(1, min_x - qx, qx - max_x, min_y - qy, qy - max_y)
+        last = max(qx - min_x, max_x - qx, qy - min_y, max_y - qy, 1)
+
+        while True:
+            ids = self._window_ids(qx, qy, radius)
+            if ids is not None:
+                dists = segment_distances(self, ids, lat, lon)
+                best = dists.min()
+                # Anything outside the window is at least `radius` whole cells away
+                if best < radius * self._min_cell_meters or radius >= last:
+                    return int(ids[dists.argmin()]), float(best)
+            elif radius >= last:
+                return None
+            radius = min(radius * 2, last)
+
+    def _nearest_scalar(self, lat, lon):
+        """Pure-Python ring-by-ring grid search, used when NumPy is unavailable."""
+        min_x, min_y, max_x, max_y = self.bounds
+        qx, qy = self._cell(lon), self._cell(lat)
+        # Skip empty rings when the point lies outside the grid
+        start = max(0, min_x - qx, qx - max_x, min_y - qy, qy - max_y)
+        last = max(qx - min_x, max_x - qx, qy - min_y, max_y - qy)
+
+        dlon, py = self.project(lat, lon)
+        best_id = -1
+        best_dist = float("inf")
+        seen = set()
+        for ring in range(start, last + 1):
+            for cx, cy in self._ring_cells(qx, qy, ring):
+                for seg_id in self._cell_members(cx, cy):
+                    if seg_id in seen:
+                        continue
+                    seen.add(seg_id)
+                    dist = self._projected_distance(seg_id, dlon, py)
+                    if dist < best_dist or (dist == best_dist and seg_id < best_id):
+                        best_dist = dist
+                        best_id = seg_id
+            # Anything not yet visited is at least `ring` whole cells away
+            if best_id >= 0 and best_dist < ring * self._min_cell_meters:
+                break
+
+        if best_id < 0:
+            return None
+        return best_id, best_dist
+
+
+def segment_distances(store, ids, lat, lon):
+    """
+    Vectorized distance_point_to_segment_meters: distances in metres from
+    (lat, lon) to every segment row in the NumPy index array `ids`.
+    """
+    x1, y1, ux, uy, length, m_lon = (column[ids] for column in store.numpy_columns()[:6])
+    dlon, qy = store.project(lat, lon)
+    ax = dlon * m_lon - x1
+    ay = qy - y1
+    t = np.clip(ax * ux + ay * uy, 0.0, length)
+    ex = ax - t * ux
+    ey = ay - t * uy
+    return np.sqrt(ex * ex + ey * ey)
+
+
+class SegmentCursor:
+    """
+    Per-tracker incremental nearest-segment lookup. After a full search it
+    keeps the segments bucketed in the 3x3 cells around the match; while later
+    points stay inside that window and the best candidate is closer than the
+    window edge, the answer is exact without touching the rest of the index.
+    """
+
+    def __init__(self):
+        self._store = None
+        self._window = None  # (min_lon, min_lat, max_lon, max_lat) in degrees
+        self._ids = None
+        self.last_id = None
+        self.reused = 0
+        self.searched = 0
+
+    def reset(self):
+        self._store = None
+        self._window = None
+        self._ids = None
+        self.last_id = None
+
+    def nearest(self, store, lat, lon):
+        """Same contract as SegmentStore.nearest, reusing the previous neighbourhood when possible."""
+        if store is not self._store:
+            self.reset()
+            self._store = store
+        if self._ids is not None:
+            match = self._nearest_in_window(lat, lon)
+            if match is not None:
+                self.reused += 1
+                self.last_id = match[0]
+                return match
+
+        self.searched += 1
+        match = store.nearest(lat, lon)
+        if match is None:
+            self._ids = None
+            return None
+        self.last_id = match[0]
+        self._anchor(lat, lon)
+        return match
+
+    def _anchor(self, lat, lon):
+        """Remember the segments in the cells around (lat, lon) for the next lookups."""
+        store = self._store
+        size = store.cell_size
+        qx, qy = store._cell(lon), store._cell(lat)
+        self._window = ((qx - 1) * size, (qy - 1) * size, (qx + 2) * size, (qy + 2) * size)
+        if np is not None:
+            self._ids = store._window_ids(qx, qy, 1)
+        else:
+            min_x, min_y, max_x, max_y = store.bounds
+            ids = set()
+            for cx in range(max(qx - 1, min_x), min(qx + 1, max_x) + 1):
+                for cy in range(max(qy - 1, min_y), min(qy + 1, max_y) + 1):
+                    ids.update(store._cell_members(cx, cy))
+            self._ids = sorted(ids) or None
+
+    def _nearest_in_window(self, lat, lon):
+        store = self._store
+        min_lon, min_lat, max_lon, max_lat = self._window
+        margin_lon = min(lon - min_lon, max_lon - lon)
+        margin_lat = min(lat - min_lat, max_lat - lat)
+        if margin_lon <= 0 or margin_lat <= 0:
+            return None
+        # Segments outside the window lie wholly outside it, so they are at least this far away
+        margin = min(
+            margin_lon * store._min_cell_meters / store.cell_size,
+            margin_lat * METERS_PER_DEG_LAT,
+        )
+        if np is not None:
+            dists = segment_distances(store, self._ids, lat, lon)
+            best = int(dists.argmin())
+            seg_id, dist = int(self._ids[best]), float(dists[best])
+        else:
+            dlon, qy = store.project(lat, lon)
+            seg_id, dist = -1, float("inf")
+            for i in self._ids:
+                d = store._projected_distance(i, dlon, qy)
+                if d < dist:
+                    seg_id, dist = i, d
+        if dist < margin:
+            return seg_id, dist
         return None
 
-    closest_feature = None
-    min_dist = float("inf")
-    closest_segment_bearing = 0
-    
-    # Iterate through features
-    for feature in geojson['features']:
+
+class LookupCache:
+    """
+    Bounded LRU memo of lookup results keyed by (dataset version, quantized
+    lat/lon, rotation bucket). A parked vehicle reports the same or jittering
+    coordinates for hours; repeated polls are answered from here. Entries of
+    an older dataset are dropped as soon as a lookup uses a new store.
+    """
+
+    def __init__(self, size=LOOKUP_CACHE_SIZE, decimals=LOOKUP_CACHE_DECIMALS):
+        self._size = size
+        self._decimals = decimals
+        self._entries = OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._version = None
+
+    def lookup(self, store, lat, lon, rotation, compute):
+        """Memoized result for the query, calling compute() on a miss."""
+        if store.version != self._version:
+            self._entries.clear()
+            self._version = store.version
+        key = (
+            store.version,
+            round(lat, self._decimals),
+            round(lon, self._decimals),
+            rotation_bucket(rotation),
+        )
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        result = compute()
+        self._entries[key] = result
+        if len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+        return result
+
+
+def compile_segments(geojson):
+    """
+    Compiles the LineString features of a GeoJSON FeatureCollection into a
+    SegmentStore. The returned store does not reference the source dict.
+    """
+    builder = _StoreBuilder(dedupe=False)
+    for feature in (geojson or {}).get('features', []):
         geometry = feature.get('geometry')
         if not geometry or geometry['type'] != 'LineString':
             continue
-
         coords = geometry['coordinates']
-        # Iterate segments
+        if len(coords) < 2:
+            continue
+
+        pid = builder.add_properties(feature.get('properties') or {})
         for i in range(len(coords) - 1):
-            p1 = coords[i]   # [lon, lat]
-            p2 = coords[i+1] # [lon, lat]
-            
-            # Distance logic
-            dist = distance_point_to_segment_meters(lon, lat, p1[0], p1[1], p2[0], p2[1])
-            
-            if dist < min_dist:
-                min_dist = dist
-                closest_feature = feature
-                # Calculate bearing of the street segment
-                closest_segment_bearing = get_bearing(p1[1], p1[0], p2[1], p2[0])
-
-    if not closest_feature:
+            x1, y1 = coords[i][0], coords[i][1]      # lon, lat
+            x2, y2 = coords[i+1][0], coords[i+1][1]  # lon, lat
+            builder.add_segment(pid, x1, y1, x2, y2)
+    return builder.finish()
+
+
+def merge_segment_stores(stores):
+    """
+    Merges compiled SegmentStores (e.g. every neighborhood) into one store with
+    a single spatial index, without going back to the GeoJSON. Segments that
+    appear in more than one store with the same properties, as they do along
+    neighborhood boundaries, are kept once regardless of direction.
+    """
+    builder = _StoreBuilder(dedupe=True)
+    for store in stores:
+        pids = [
+            builder.add_properties(props, schedules)
+            for props, schedules in zip(store.properties, store.schedules)
+        ]
+        for i in range(len(store)):
+            builder.add_segment(
+                pids[store.prop_id[i]],
+                store.lon1[i], store.lat1[i], store.lon2[i], store.lat2[i],
+                store.bearing[i], store.m_per_deg_lon[i],
+            )
+    return builder.finish()
+
+
+class _StoreBuilder:
+    """Appends rows to a new SegmentStore, de-duplicating properties (and optionally segments)."""
+
+    def __init__(self, dedupe):
+        self.store = SegmentStore()
+        self._prop_ids = {}
+        self._seen = set() if dedupe else None
+
+    def add_properties(self, props, schedules=None):
+        key = json.dumps(props, sort_keys=True, default=str)
+        pid = self._prop_ids.get(key)
+        if pid is None:
+            pid = self._prop_ids[key] = len(self.store.properties)
+            self.store.properties.append(props)
+            self.store.schedules.append(compile_schedules(props) if schedules is None else schedules)
+        return pid
+
+    def add_segment(self, pid, x1, y1, x2, y2, bearing=None, m_per_deg_lon=None):
+        if self._seen is not None:
+            # ~1 cm precision; direction does not matter for matching
+            ends = sorted(((round(x1, 7), round(y1, 7)), (round(x2, 7), round(y2, 7))))
+            key = (pid, ends[0], ends[1])
+            if key in self._seen:
+                return
+            self._seen.add(key)
+        store = self.store
+        store.lon1.append(x1)
+        store.lat1.append(y1)
+        store.lon2.append(x2)
+        store.lat2.append(y2)
+        store.bearing.append(get_bearing(y1, x1, y2, x2) if bearing is None else bearing)
+        store.m_per_deg_lon.append(
+            METERS_PER_DEG_LAT * math.cos(math.radians((y1 + y2) / 2.0)) if m_per_deg_lon is None else m_per_deg_lon
+        )
+        store.prop_id.append(pid)
+
+    def finish(self):
+        store = self.store
+        store._build_grid()
+        store._project()
+        if np is not None:
+            # Create the NumPy views now, while still in the (executor) compile step
+            store.numpy_columns()
+        return store
+
+
+def compile_schedules(props):
+    """Cleaning timelines for every side of a segment's properties."""
+    schedules = {}
+    sides = props.get('Sides')
+    if isinstance(sides, dict):
+        for side, info in sides.items():
+            timeline = compile_side_schedule(info)
+            if timeline is not None:
+                schedules[side] = timeline
+    return schedules
+
+
+def find_cleaning_data(store, lat, lon, rotation, cursor=None):
+    """
+    Finds the closest street segment and determines the side.
+    `store` is a SegmentStore (a raw GeoJSON dict is compiled on the fly).
+    Pass a SegmentCursor to reuse the previous match's neighbourhood.
+    Returns a dictionary with street info or None.
+    """
+    if not isinstance(store, SegmentStore):
+        if not store or 'features' not in store:
+            return None
+        store = compile_segments(store)
+
+    match = cursor.nearest(store, lat, lon) if cursor is not None else store.nearest(lat, lon)
+    if not match:
         return None
+    return describe_match(store, match[0], match[1], rotation)
+
+
+def find_cleaning_data_batch(store, lats, lons, rotations):
+    """
+    Batch version of find_cleaning_data for many points (fleets, GPS trace
+    replay). Shares grid windows and vectorized distance work across queries.
+    Returns a list with one result dict (or None) per input point.
+    """
+    if not isinstance(store, SegmentStore):
+        store = compile_segments(store)
+    matches = store.nearest_batch(lats, lons)
+    return [
+        describe_match(store, match[0], match[1], rotation) if match else None
+        for match, rotation in zip(matches, rotations)
+    ]
+
 
-    props = closest_feature['properties']
+def describe_match(store, seg_id, min_dist, rotation):
+    """Resolves street name, parked side and cleaning info for a matched segment row."""
+    closest_segment_bearing = store.bearing[seg_id]
+
+    pid = store.prop_id[seg_id]
+    props = store.properties[pid]
     street_name = props.get('streetname', props.get('Corridor', props.get('StreetIdentifier', 'Unknown')))
     
     # Side detection logic
@@ -114,39 +706,20 @@ def find_cleaning_data(geojson, lat, lon, rotation):
          detected_side_key = "Median"
     else:
         # 2. Heading-based Side Logic
-        # Normalize bearing to 0-360
-        street_bearing = closest_segment_bearing
-        
-        # Determine strict cardinal side of the street relative to the line
-        # Logic adapted from 'main.py'
-        
-        # Determine if street is roughly North-South or East-West
-        # N-S: Bearings 315-45 OR 135-225
-        is_ns_street = (315 <= street_bearing or street_bearing < 45) or (135 <= street_bearing < 225)
-        
-        if is_ns_street:
-             # North-South Street
-             # 0=North, 90=East, 180=South, 270=West
-             if rotation < 90 or rotation > 270: # Heading North-ish
-                 detected_side_key = "East"      # Right side of N-bound traffic is East
-             elif 90 < rotation < 270:           # Heading South-ish
-                 detected_side_key = "West"      # Right side of S-bound traffic is West
-        else:
-            # East-West Street
-            if rotation < 180: # Heading North/East (0-180) -> mostly East-ish for E-W street
-                 detected_side_key = "South" # Right side of E-bound traffic is South
-            else:
-                 detected_side_key = "North" # Right side of W-bound traffic is North
+        detected_side_key = heading_side(closest_segment_bearing, rotation)
 
     # Fallback/Validation
     cleaning_info = None
     available_sides = list(props.get('Sides', {}).keys())
     
+    side_key = None
     if detected_side_key and detected_side_key in props.get('Sides', {}):
+        side_key = detected_side_key
         cleaning_info = props['Sides'][detected_side_key]
         side = detected_side_key
     elif len(available_sides) > 0:
         # Default to first available if detection fails
+        side_key = available_sides[0]
         side = f"{available_sides[0]} (Defaulted)"
         cleaning_info = props['Sides'][available_sides[0]]
 
@@ -155,5 +728,171 @@ def find_cleaning_data(geojson, lat, lon, rotation):
         "nextCleaning": cleaning_info,
         "parkedOnSide": side,
         "distance": min_dist,
-        "median": is_median
+        "median": is_median,
+        "bearing": closest_segment_bearing,
+        # Precompiled (starts, ends) epoch timeline for the matched side, or None
+        "schedule": store.schedules[pid].get(side_key),
     }
+
+
+def heading_side(street_bearing, rotation):
+    """
+    Cardinal side of a street with bearing `street_bearing` that a vehicle
+    heading `rotation` is parked on (right-hand side of traffic), or None.
+    """
+    # Determine strict cardinal side of the street relative to the line
+    # Logic adapted from 'main.py'
+
+    # Determine if street is roughly North-South or East-West
+    # N-S: Bearings 315-45 OR 135-225
+    is_ns_street = (315 <= street_bearing or street_bearing < 45) or (135 <= street_bearing < 225)
+
+    if is_ns_street:
+        # North-South Street
+        # 0=North, 90=East, 180=South, 270=West
+        if rotation < 90 or rotation > 270:  # Heading North-ish
+            return "East"                    # Right side of N-bound traffic is East
+        if 90 < rotation < 270:              # Heading South-ish
+            return "West"                    # Right side of S-bound traffic is West
+        return None
+    # East-West Street
+    if rotation < 180:  # Heading North/East (0-180) -> mostly East-ish for E-W street
+        return "South"  # Right side of E-bound traffic is South
+    return "North"      # Right side of W-bound traffic is North
+
+
+def rotation_bucket(rotation):
+    """
+    Coarsest partition of headings over which heading_side() is constant for
+    every street bearing: the four open quadrants (0 and 180 join the
+    quadrant after them) plus due East and due West.
+    """
+    if rotation == 90 or rotation == 270:
+        return rotation
+    if rotation < 90:
+        return 0
+    if rotation < 180:
+        return 1
+    if rotation < 270:
+        return 2
+    return 3
+
+
+def planar_distance_meters(lat1, lon1, lat2, lon2):
+    """Equirectangular distance in metres between two nearby points."""
+    dx = (lon2 - lon1) * METERS_PER_DEG_LAT * math.cos(math.radians((lat1 + lat2) / 2.0))
+    dy = (lat2 - lat1) * METERS_PER_DEG_LAT
+    return math.sqrt(dx * dx + dy * dy)
+
+
+# Coarse grid over neighborhood polygon bounding boxes (~1km cells)
+NEIGHBORHOOD_CELL_DEGREES = 0.01
+
+
+def compile_ring(ring):
+    """
+    Precompiles a polygon ring (list of [lon, lat]) into its bbox and edge
+    columns (x1, y1, y2, dx/dy) for ray casting. Horizontal edges can never
+    cross the ray and are dropped; the ring is treated as closed.
+    """
+    xs = [p[0] for p in ring]
+    ys = [p[1] for p in ring]
+    x1, y1, y2, slope = [], [], [], []
+    n = len(ring)
+    for i in range(n):
+        ax, ay = xs[i], ys[i]
+        bx, by = xs[i - n + 1], ys[i - n + 1]
+        if ay == by:
+            continue
+        x1.append(ax)
+        y1.append(ay)
+        y2.append(by)
+        slope.append((bx - ax) / (by - ay))
+    bbox = (min(xs), min(ys), max(xs), max(ys))
+    if np is not None:
+        return bbox, np.array(x1), np.array(y1), np.array(y2), np.array(slope)
+    return bbox, array('d', x1), array('d', y1), array('d', y2), array('d', slope)
+
+
+def point_in_ring(lat, lon, ring):
+    """Even-odd ray casting against a ring compiled by compile_ring."""
+    (min_lon, min_lat, max_lon, max_lat), x1, y1, y2, slope = ring
+    if not (min_lon <= lon <= max_lon and min_lat <= lat <= max_lat):
+        return False
+    if np is not None and isinstance(x1, np.ndarray):
+        crosses = (y1 > lat) != (y2 > lat)
+        return bool(np.count_nonzero(crosses & (lon < x1 + (lat - y1) * slope)) & 1)
+    inside = False
+    for i in range(len(x1)):
+        ay = y1[i]
+        if (ay > lat) != (y2[i] > lat) and lon < x1[i] + (lat - ay) * slope[i]:
+            inside = not inside
+    return inside
+
+
+class NeighborhoodIndex:
+    """
+    Neighborhood MultiPolygons from neighborhoods.geojson, flattened to one row
+    per polygon of precompiled rings (see compile_ring). Polygon ids are bucketed
+    in a coarse grid by bbox, so find() only ray-casts polygons whose bbox
+    contains the point; interior rings (holes) are honoured.
+    """
+
+    def __init__(self, cell_size=NEIGHBORHOOD_CELL_DEGREES):
+        self.cell_size = cell_size
+        self.names = []      # FileName per polygon
+        self.polygons = []   # compiled rings per polygon: exterior first, then holes
+        self.bboxes = []     # (min_lon, min_lat, max_lon, max_lat) per polygon
+        self.cells = {}
+        self._by_name = {}
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def _cell(self, value):
+        return math.floor(value / self.cell_size)
+
+    def add(self, name, polygon):
+        """Adds one GeoJSON polygon: exterior ring followed by optional holes."""
+        rings = [compile_ring(ring) for ring in polygon if ring]
+        bbox = rings[0][0]
+        poly_id = len(self.polygons)
+        self.names.append(name)
+        self.polygons.append(rings)
+        self.bboxes.append(bbox)
+        self._by_name.setdefault(name, []).append(poly_id)
+        for cx in range(self._cell(bbox[0]), self._cell(bbox[2]) + 1):
+            for cy in range(self._cell(bbox[1]), self._cell(bbox[3]) + 1):
+                self.cells.setdefault((cx, cy), []).append(poly_id)
+
+    def _polygon_contains(self, poly_id, lat, lon):
+        exterior, *holes = self.polygons[poly_id]
+        if not point_in_ring(lat, lon, exterior):
+            return False
+        return not any(point_in_ring(lat, lon, hole) for hole in holes)
+
+    def contains(self, name, lat, lon):
+        """True if (lat, lon) lies inside the neighborhood `name`."""
+        return any(self._polygon_contains(poly_id, lat, lon) for poly_id in self._by_name.get(name, ()))
+
+    def find(self, lat, lon):
+        """Return the FileName of the neighborhood containing (lat, lon), or None."""
+        for poly_id in self.cells.get((self._cell(lon), self._cell(lat)), ()):
+            if self._polygon_contains(poly_id, lat, lon):
+                return self.names[poly_id]
+        return None
+
+
+def compile_neighborhoods(index_geojson):
+    """Compiles the neighborhoods index FeatureCollection into a NeighborhoodIndex."""
+    index = NeighborhoodIndex()
+    for feat in (index_geojson or {}).get("features", []):
+        props = feat.get("properties", {})
+        fname = props.get("FileName")
+        geom = feat.get("geometry", {})
+        if not fname or geom.get("type") != "MultiPolygon":
+            continue
+        for poly in geom.get("coordinates", []):
+            if poly and poly[0]:
+                index.add(fname, poly)
+    return index
@@ -0,0 +1,92 @@
+"""Precompiled cleaning schedule timelines for SF Street Cleaning."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from .const import CLEANING_DURATION_HOURS
+
+# Schedule strings without an offset are San Francisco local time
+SF_TZ = ZoneInfo("America/Los_Angeles")
+
+
+def _parse_timestamp(value) -> int | None:
+    if not isinstance(value, str) or value == "Unknown":
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=SF_TZ)
+    return int(parsed.timestamp())
+
+
+def _duration_seconds(info: dict) -> int:
+    """Sweeping duration from FromHour/ToHour when present, else the default."""
+    try:
+        hours = float(info["ToHour"]) - float(info["FromHour"])
+    except (KeyError, TypeError, ValueError):
+        hours = 0
+    if hours <= 0:
+        hours = CLEANING_DURATION_HOURS
+    return int(hours * 3600)
+
+
+def compile_side_schedule(info) -> tuple[array, array] | None:
+    """
+    Parses the cleaning info of one street side (a dict such as
+    {"NextCleaning": "2025-12-18T09:00:00-08:00", ...} or a bare ISO string)
+    into a timeline: parallel sorted arrays of (start, end) epoch seconds.
+    Every "...Cleaning" key is an occurrence; its end comes from a matching
+    "...CleaningEnd" key, else FromHour/ToHour, else CLEANING_DURATION_HOURS.
+    Overlapping windows are merged. Returns None if nothing parses.
+    """
+    if isinstance(info, str):
+        info = {"NextCleaning": info}
+    if not isinstance(info, dict):
+        return None
+
+    duration = None
+    windows = []
+    for key, value in info.items():
+        if not key.endswith("Cleaning"):
+            continue
+        start = _parse_timestamp(value)
+        if start is None:
+            continue
+        end = _parse_timestamp(info.get(f"{key}End"))
+        if end is None or end <= start:
+            if duration is None:
+                duration = _duration_seconds(info)
+            end = start + duration
+        windows.append((start, end))
+    if not windows:
+        return None
+
+    windows.sort()
+    starts, ends = array('q'), array('q')
+    for start, end in windows:
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def next_window(timeline: tuple[array, array] | None, now: float) -> tuple[int, int] | None:
+    """The (start, end) window in progress at `now`, or the next one; None if all have passed."""
+    if not timeline:
+        return None
+    starts, ends = timeline
+    i = bisect_right(ends, now)
+    if i == len(ends):
+        return None
+    return starts[i], ends[i]
+
+
+def to_datetime(timestamp: int) -> datetime:
+    return datetime.fromtimestamp(timestamp, SF_TZ)
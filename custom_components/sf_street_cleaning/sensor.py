@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+import math
 from typing import Any
 from datetime import datetime, timedelta
 
@@ -12,19 +13,26 @@ from homeassistant.const import (
     STATE_UNAVAILABLE,
     CONF_NAME,
 )
-from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.event import async_track_point_in_time, async_track_state_change_event
 from homeassistant.util import dt as dt_util
 
 from .const import (
-    DOMAIN,
     CONF_DEVICE_TRACKER,
-    GEOJSON_URL,
-    GEOJSON_REFRESH_INTERVAL_HOURS,
-    NEIGHBORHOODS_INDEX_URL,
+    CONF_MIN_MOVE_METERS,
+    CONF_DISTANCE_RESOLUTION,
+    CONF_HOURS_RESOLUTION,
+    CONF_ALERT_LEAD_TIMES,
+    CLEANING_IN_HOURS_FINE_STEP,
+    CLEANING_IN_HOURS_FINE_WINDOW,
+    DEFAULT_MIN_MOVE_METERS,
+    DEFAULT_DISTANCE_RESOLUTION,
+    DEFAULT_HOURS_RESOLUTION,
+    DEFAULT_ALERT_LEAD_TIMES,
     NEIGHBORHOOD_FILE_URL_TEMPLATE,
+    STATE_LOADING,
+    WARNING_HOURS,
     ATTR_STREET,
     ATTR_SIDE,
     ATTR_NEXT_CLEANING,
@@ -33,10 +41,29 @@ from .const import (
     ATTR_CLEANING_IN_HOURS,
     ATTR_DISTANCE,
 )
-from .geometry import find_cleaning_data
+from .alerts import AlertScheduler
+from .coordinator import async_get_coordinator, dataset_url
+from .schedule import compile_side_schedule, next_window, to_datetime
+from .geometry import (
+    LookupCache,
+    NeighborhoodIndex,
+    SegmentCursor,
+    SegmentStore,
+    compile_neighborhoods,
+    compile_segments,
+    find_cleaning_data,
+    heading_side,
+    planar_distance_meters,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# State changes are scheduled with timers; polling is only a safety net
+# (and picks up neighborhood switches / dataset retries)
+SCAN_INTERVAL = timedelta(minutes=15)
+# Fire a little after a boundary so rounding has definitely flipped
+TRANSITION_SLACK = timedelta(seconds=1)
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -44,15 +71,75 @@ async def async_setup_entry(
 ) -> None:
     """Set up the sensor platform."""
     device_tracker_id = entry.data.get(CONF_DEVICE_TRACKER)
-    geojson = hass.data[DOMAIN].get("geojson")
-    geojson_url = hass.data[DOMAIN].get("geojson_url", GEOJSON_URL)
-    neighborhoods_index = hass.data[DOMAIN].get("neighborhoods_index")
+    geojson_url = dataset_url(entry.data)
+    min_move_meters = float(entry.data.get(CONF_MIN_MOVE_METERS, DEFAULT_MIN_MOVE_METERS))
+    distance_resolution = float(entry.data.get(CONF_DISTANCE_RESOLUTION, DEFAULT_DISTANCE_RESOLUTION))
+    hours_resolution = float(entry.data.get(CONF_HOURS_RESOLUTION, DEFAULT_HOURS_RESOLUTION))
+    alert_lead_times = []
+    for minutes in entry.data.get(CONF_ALERT_LEAD_TIMES, DEFAULT_ALERT_LEAD_TIMES):
+        try:
+            alert_lead_times.append(timedelta(minutes=float(minutes)))
+        except (TypeError, ValueError):
+            _LOGGER.warning("Street cleaning: ignoring invalid alert lead time %r", minutes)
+    coordinator = async_get_coordinator(hass)
+    # None while the initial download is still running in the background
+    segment_store = coordinator.segments(geojson_url) if geojson_url else None
+    neighborhoods_index = coordinator.neighborhoods
     
     if not device_tracker_id:
         _LOGGER.error("No device_tracker_id found in config entry")
         return
 
-    async_add_entities([SFStreetCleaningSensor(hass, device_tracker_id, geojson, geojson_url, neighborhoods_index)], True)
+    async_add_entities([
+        SFStreetCleaningSensor(
+            hass, device_tracker_id, geojson_url, neighborhoods_index, segment_store,
+            min_move_meters=min_move_meters,
+            distance_resolution=distance_resolution,
+            hours_resolution=hours_resolution,
+            alert_lead_times=alert_lead_times,
+        )
+    ])
+
+
+def _hours_step(hours: float, resolution: float) -> float:
+    """Rounding step of cleaning_in_hours `hours` before cleaning."""
+    if hours < CLEANING_IN_HOURS_FINE_WINDOW or resolution <= CLEANING_IN_HOURS_FINE_STEP:
+        return CLEANING_IN_HOURS_FINE_STEP
+    return resolution
+
+
+def quantize_hours(hours: float, resolution: float = DEFAULT_HOURS_RESOLUTION) -> float:
+    """
+    cleaning_in_hours as published: rounded to `resolution` until the last
+    CLEANING_IN_HOURS_FINE_WINDOW hours, then to CLEANING_IN_HOURS_FINE_STEP.
+    """
+    step = _hours_step(hours, resolution)
+    return round(round(hours / step) * step, 2)
+
+
+def next_state_change(
+    cleaning_start: datetime,
+    cleaning_end: datetime,
+    now: datetime,
+    resolution: float = DEFAULT_HOURS_RESOLUTION,
+) -> datetime | None:
+    """
+    Next instant after `now` at which the state ("Clear" -> "Warning" ->
+    "Sweeping Now" -> next window) or cleaning_in_hours (see quantize_hours)
+    changes, or None once the cleaning window has passed.
+    """
+    hours = (cleaning_start - now).total_seconds() / 3600.0
+    end_hours = (cleaning_start - cleaning_end).total_seconds() / 3600.0
+    if hours <= end_hours:
+        return None
+    # Rounding flips half a step below every multiple; take the closest flip below the current value
+    step = _hours_step(hours, resolution)
+    boundary = (math.ceil(hours / step - 0.5) - 0.5) * step
+    if boundary >= hours:
+        boundary -= step
+    thresholds = [t for t in (WARNING_HOURS, CLEANING_IN_HOURS_FINE_WINDOW, 0.0, end_hours) if t < hours]
+    target = max([boundary, *thresholds])
+    return cleaning_start - timedelta(hours=max(target, end_hours))
 
 
 class SFStreetCleaningSensor(SensorEntity):
@@ -61,23 +148,45 @@ class SFStreetCleaningSensor(SensorEntity):
     _attr_name = "SF Street Cleaning Status"
     _attr_icon = "mdi:broom"
     _attr_has_entity_name = True
-    _attr_should_poll = True  # allow HA to poll in case tracker events are missed
+    _attr_should_poll = True  # slow safety-net poll (SCAN_INTERVAL) in case tracker events are missed
+    # Change on nearly every update; keep them out of the recorder database
+    _unrecorded_attributes = frozenset({ATTR_DISTANCE, ATTR_CLEANING_IN_HOURS})
 
-    def __init__(self, hass: HomeAssistant, device_tracker_id: str, geojson: dict, geojson_url: str | None, neighborhoods_index: dict | None):
+    def __init__(self, hass: HomeAssistant, device_tracker_id: str, geojson_url: str | None, neighborhoods_index: NeighborhoodIndex | None, segment_store: SegmentStore | None = None, min_move_meters: float = DEFAULT_MIN_MOVE_METERS, distance_resolution: float = DEFAULT_DISTANCE_RESOLUTION, hours_resolution: float = DEFAULT_HOURS_RESOLUTION, alert_lead_times: list[timedelta] | None = None):
         """Initialize the sensor."""
         self.hass = hass
+        self._coordinator = async_get_coordinator(hass)
         self._device_tracker_id = device_tracker_id
-        self._geojson = geojson
+        # Compiled segment table + spatial index; raw GeoJSON is not kept around.
+        # None until the dataset has been loaded.
+        self._segments = segment_store
         self._geojson_url = geojson_url  # None triggers neighborhood auto-detect
+        self._active_url = geojson_url  # URL whose segments the sensor currently uses
         self._neighborhoods_index = neighborhoods_index
+        self._last_neighborhood: str | None = None
+        # Reuses the previous match's neighbouring segments between tracker updates
+        self._cursor = SegmentCursor()
+        # Memoized lookups for (quantized) positions seen before on this dataset
+        self._lookup_cache = LookupCache()
+        # Last full lookup: (segments, lat, lon, rotation, result)
+        self._min_move_meters = min_move_meters
+        self._last_match: tuple | None = None
+        self._distance_resolution = distance_resolution
+        self._hours_resolution = hours_resolution
+        # (state, attributes) last handed to async_write_ha_state
+        self._written: tuple | None = None
+        # Start of the matched cleaning window and the timer for its next state change
+        self._cleaning_start: datetime | None = None
+        self._cleaning_end: datetime | None = None
+        self._unsub_transition: CALLBACK_TYPE | None = None
         self._state = STATE_UNKNOWN
         self._attributes = {}
         self._attr_unique_id = f"sf_street_cleaning_{device_tracker_id}"
-        
-        # Track last alert to avoid spamming
-        self._last_alert_time: dict[str, datetime] = {}
-        # Cache neighborhood geojsons to avoid refetching
-        self._neighborhood_geojsons: dict[str, dict] = {}
+
+        # Fires EVENT_ALERT once per lead time per parking session
+        if alert_lead_times is None:
+            alert_lead_times = [timedelta(minutes=m) for m in DEFAULT_ALERT_LEAD_TIMES]
+        self._alerts = AlertScheduler(hass, alert_lead_times)
 
     async def async_added_to_hass(self) -> None:
         """Handle entity which will be added."""
@@ -87,7 +196,16 @@ class SFStreetCleaningSensor(SensorEntity):
                 self.hass, [self._device_tracker_id], self._async_on_tracker_update
             )
         )
+        # Pick up datasets as soon as the shared coordinator loads or refreshes them
+        self.async_on_remove(
+            self._coordinator.async_add_listener(self._async_on_segments_updated)
+        )
+        self.async_on_remove(self._async_cancel_transition)
+        self.async_on_remove(self._alerts.async_cancel)
         self._update_sensor_state()
+        if not self._geojson_url:
+            # Detect the neighborhood now rather than at the first poll
+            self.hass.async_create_task(self.async_update_ha_state(force_refresh=True))
 
     async def async_update(self) -> None:
         """Poll fallback: refresh from latest tracker state."""
@@ -95,18 +213,17 @@ class SFStreetCleaningSensor(SensorEntity):
         self._update_sensor_state()
 
     async def _async_ensure_geojson(self) -> None:
-        """Refresh GeoJSON daily in case upstream data changes."""
-        data = self.hass.data.setdefault(DOMAIN, {})
-
+        """Make sure the sensor uses current data for the tracker's location."""
         # If user supplied an explicit URL, honor it
         if self._geojson_url:
-            await self._async_fetch_geojson(self._geojson_url, data)
+            await self._async_fetch_geojson(self._geojson_url)
             return
 
         # Otherwise: auto-select neighborhood based on point-in-polygon
         if not self._neighborhoods_index:
-            self._neighborhoods_index = await self._async_fetch_neighborhood_index(data)
+            self._neighborhoods_index = await self._coordinator.async_get_neighborhoods()
         if not self._neighborhoods_index:
+            self._stop_loading()
             return
 
         tracker_state = self.hass.states.get(self._device_tracker_id)
@@ -120,64 +237,129 @@ class SFStreetCleaningSensor(SensorEntity):
 
         neighborhood_file = self._find_neighborhood_file(lat, lon, self._neighborhoods_index)
         if not neighborhood_file:
+            # Outside every neighborhood: report "Out of Coverage" rather than "Loading"
+            self._stop_loading()
             return
 
         neighborhood_url = NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file=neighborhood_file)
-        await self._async_fetch_geojson(neighborhood_url, data)
+        await self._async_fetch_geojson(neighborhood_url)
+
+    async def _async_fetch_geojson(self, url: str) -> None:
+        """Switch to the coordinator's segments for url, refreshing them if they expired."""
+        self._active_url = url
+        segments = await self._coordinator.async_get_segments(url)
+        if segments is not None:
+            self._segments = segments
+        else:
+            # The next poll retries the download
+            self._stop_loading()
+
+    def _stop_loading(self) -> None:
+        """Leave the "Loading" state with an empty dataset when none could be loaded."""
+        if self._segments is None:
+            self._segments = compile_segments({})
 
-    async def _async_fetch_neighborhood_index(self, data: dict) -> dict | None:
-        """Fetch neighborhoods index (MultiPolygon per neighborhood)."""
-        try:
-            session = async_get_clientsession(self.hass)
-            _LOGGER.info("Street cleaning: fetching neighborhoods index from %s", NEIGHBORHOODS_INDEX_URL)
-            async with session.get(NEIGHBORHOODS_INDEX_URL) as resp:
-                resp.raise_for_status()
-                index = await resp.json(content_type=None)
-                data["neighborhoods_index"] = index
-                return index
-        except Exception as err:
-            _LOGGER.warning("Street cleaning: failed to fetch neighborhoods index (%s)", err)
-            return None
-
-    async def _async_fetch_geojson(self, url: str, data: dict) -> None:
-        """Fetch a GeoJSON street segment file with caching and refresh interval."""
-        data = self.hass.data.setdefault(DOMAIN, {})
-        geojson = data.get("geojson")
-        fetched_at = data.get("geojson_fetched_at")
-        now = dt_util.utcnow()
-        stale = (
-            geojson is None
-            or fetched_at is None
-            or (now - fetched_at) > timedelta(hours=GEOJSON_REFRESH_INTERVAL_HOURS)
-        )
-        if not stale:
-            self._geojson = geojson
+    @callback
+    def _async_on_segments_updated(self, url: str) -> None:
+        """Adopt a newly loaded dataset for the URL this sensor is using."""
+        if url != self._active_url:
             return
-        try:
-            session = async_get_clientsession(self.hass)
-            _LOGGER.info("Street cleaning: refreshing GeoJSON from %s", url)
-            async with session.get(url) as resp:
-                resp.raise_for_status()
-                # GitHub raw returns text/plain; allow parse despite content-type
-                new_geojson = await resp.json(content_type=None)
-                data["geojson"] = new_geojson
-                data["geojson_fetched_at"] = now
-                self._geojson = new_geojson
-                _LOGGER.debug("Street cleaning: refreshed GeoJSON with %d features", len(new_geojson.get("features", [])))
-        except Exception as err:
-            _LOGGER.warning("Street cleaning: failed to refresh GeoJSON (%s)", err)
-            # Keep existing cached geojson if available
-            if geojson:
-                self._geojson = geojson
+        self._segments = self._coordinator.segments(url)
+        self._update_sensor_state()
+        self._async_write_if_changed()
 
     @callback
     def _async_on_tracker_update(self, event) -> None:
         """Called when the device tracker state changes."""
         self._update_sensor_state()
+        self._async_write_if_changed()
+        self._async_check_neighborhood()
+
+    @callback
+    def _async_check_neighborhood(self) -> None:
+        """In auto-detect mode, switch datasets as soon as the tracker enters another neighborhood."""
+        if self._geojson_url or not self._neighborhoods_index:
+            return
+        tracker_state = self.hass.states.get(self._device_tracker_id)
+        if not tracker_state:
+            return
+        try:
+            lat = float(tracker_state.attributes.get("latitude", 0))
+            lon = float(tracker_state.attributes.get("longitude", 0))
+        except (TypeError, ValueError):
+            return
+        neighborhood_file = self._find_neighborhood_file(lat, lon, self._neighborhoods_index)
+        if neighborhood_file and NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file=neighborhood_file) != self._active_url:
+            self.hass.async_create_task(self.async_update_ha_state(force_refresh=True))
+
+    @callback
+    def _async_on_transition(self, _now: datetime) -> None:
+        """Timer for the next state or cleaning_in_hours change fired."""
+        self._unsub_transition = None
+        self._update_sensor_state()
+        self._async_write_if_changed()
+
+    @callback
+    def _async_cancel_transition(self) -> None:
+        if self._unsub_transition is not None:
+            self._unsub_transition()
+            self._unsub_transition = None
+
+    @callback
+    def _async_schedule_transition(self) -> None:
+        """(Re)arm the timer for the next instant the state or its attributes change."""
+        self._async_cancel_transition()
+        if self._cleaning_start is None:
+            return
+        when = next_state_change(self._cleaning_start, self._cleaning_end, dt_util.now(), self._hours_resolution)
+        if when is not None:
+            self._unsub_transition = async_track_point_in_time(
+                self.hass, self._async_on_transition, when + TRANSITION_SLACK
+            )
+
+    @callback
+    def _async_write_if_changed(self) -> None:
+        """Write state only when the (quantized) state or attributes changed."""
+        snapshot = (self._state, dict(self._attributes))
+        if snapshot == self._written:
+            return
+        self._written = snapshot
         self.async_write_ha_state()
 
     def _update_sensor_state(self) -> None:
+        """Retrieve new data, update the sensor state and schedule its next change."""
+        self._cleaning_start = None
+        self._compute_sensor_state()
+        self._async_schedule_transition()
+        self._async_update_alerts()
+
+    @callback
+    def _async_update_alerts(self) -> None:
+        """Hand the current parking spot and its next cleaning to the alert scheduler."""
+        if self._cleaning_start is None or self._state == "Error":
+            self._alerts.async_update(None, None, {})
+            return
+        street = self._attributes.get(ATTR_STREET)
+        side = self._attributes.get(ATTR_SIDE)
+        self._alerts.async_update(
+            (street, side),
+            self._cleaning_start,
+            {
+                "entity_id": self.entity_id,
+                "device_tracker": self._device_tracker_id,
+                ATTR_STREET: street,
+                ATTR_SIDE: side,
+                ATTR_NEXT_CLEANING: self._attributes.get(ATTR_NEXT_CLEANING),
+            },
+        )
+
+    def _compute_sensor_state(self) -> None:
         """Retrieve new data and update the sensor state."""
+        if self._segments is None:
+            self._state = STATE_LOADING
+            self._attributes = {}
+            return
+
         tracker_state = self.hass.states.get(self._device_tracker_id)
         if not tracker_state or tracker_state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
             self._state = STATE_UNKNOWN
@@ -255,7 +437,7 @@ class SFStreetCleaningSensor(SensorEntity):
             _LOGGER.debug("Street cleaning: heading=%s rotation=%s", img_val, rotation)
             
             # Use geometry logic
-            result = find_cleaning_data(self._geojson, lat, lon, rotation)
+            result = self._match_position(lat, lon, rotation)
             
             if not result:
                 self._state = "Out of Coverage"
@@ -270,53 +452,44 @@ class SFStreetCleaningSensor(SensorEntity):
             self._attributes = {
                 ATTR_STREET: result.get("street"),
                 ATTR_SIDE: result.get("parkedOnSide"),
-                ATTR_DISTANCE: result.get("distance"),
+                ATTR_DISTANCE: self._quantize_distance(result.get("distance")),
                 "median": result.get("median")
             }
             
             next_cleaning_raw = result.get("nextCleaning")
-            
-            # Parsing cleaning time
-            # Expected format: {'NextCleaning': '2025-12-18T09:00:00-08:00', ...} or just a string?
-            # Based on user's code, it seems to be a dict with key 'NextCleaning' or a string.
-            
-            cleaning_dt = None
+            # Expected format: {'NextCleaning': '2025-12-18T09:00:00-08:00', ...} or just a string
             if isinstance(next_cleaning_raw, dict):
-                cleaning_str = next_cleaning_raw.get("NextCleaning")
-                self._attributes[ATTR_NEXT_CLEANING] = cleaning_str
-                if cleaning_str and cleaning_str != "Unknown":
-                    try:
-                        cleaning_dt = datetime.fromisoformat(cleaning_str)
-                    except ValueError:
-                        pass
+                self._attributes[ATTR_NEXT_CLEANING] = next_cleaning_raw.get("NextCleaning")
             elif isinstance(next_cleaning_raw, str):
-                 self._attributes[ATTR_NEXT_CLEANING] = next_cleaning_raw
-                 if next_cleaning_raw != "Unknown":
-                     try:
-                        cleaning_dt = datetime.fromisoformat(next_cleaning_raw)
-                     except ValueError:
-                        pass
-            
-            if cleaning_dt:
-                now = dt_util.now()
-                delta = cleaning_dt - now
-                hours_until = delta.total_seconds() / 3600.0
-                self._attributes[ATTR_CLEANING_IN_HOURS] = round(hours_until, 1)
+                self._attributes[ATTR_NEXT_CLEANING] = next_cleaning_raw
+
+            # Timelines are precompiled with the dataset; other callers may hand us raw info
+            timeline = result["schedule"] if "schedule" in result else compile_side_schedule(next_cleaning_raw)
+            now = dt_util.now()
+            window = next_window(timeline, now.timestamp())
+
+            if window:
+                cleaning_dt, cleaning_end = to_datetime(window[0]), to_datetime(window[1])
+                self._cleaning_start = cleaning_dt
+                self._cleaning_end = cleaning_end
+                hours_until = (cleaning_dt - now).total_seconds() / 3600.0
+                self._attributes[ATTR_CLEANING_IN_HOURS] = quantize_hours(hours_until, self._hours_resolution)
                 self._attributes[ATTR_NEXT_CLEANING_START] = cleaning_dt.isoformat()
-                
+                self._attributes[ATTR_NEXT_CLEANING_END] = cleaning_end.isoformat()
+
                 # Determine State
                 if hours_until < 0:
-                     # Currently sweeping? Or just passed? We assume 2h duration if unknown
-                     if hours_until > -2.0:
-                         self._state = "Sweeping Now"
-                     else:
-                         self._state = "Clear" # Passed
-                elif hours_until < 24:
+                    self._state = "Sweeping Now"  # window has not ended yet
+                elif hours_until < WARNING_HOURS:
                     self._state = "Warning"
                 else:
                     self._state = "Clear"
                 _LOGGER.debug("Street cleaning: matched %s side=%s hours_until=%.2f", result.get('street'), result.get('parkedOnSide'), hours_until)
-                    
+            elif timeline:
+                # Every known cleaning has passed
+                self._state = "Clear"
+                self._attributes[ATTR_CLEANING_IN_HOURS] = -1
+                _LOGGER.debug("Street cleaning: matched %s, all known cleanings have passed", result.get('street'))
             else:
                 self._state = "No Schedule Found"
                 self._attributes[ATTR_CLEANING_IN_HOURS] = -1
@@ -326,42 +499,54 @@ class SFStreetCleaningSensor(SensorEntity):
             _LOGGER.error("Error updating street cleaning sensor: %s", e)
             self._state = "Error"
 
-    def _find_neighborhood_file(self, lat: float, lon: float, index: dict) -> str | None:
+    def _quantize_distance(self, distance: float | None) -> float | None:
+        """Round distance_to_segment to the configured resolution."""
+        if distance is None or self._distance_resolution <= 0:
+            return distance
+        step = self._distance_resolution
+        return round(round(distance / step) * step, 2)
+
+    def _match_position(self, lat: float, lon: float, rotation: int) -> dict | None:
+        """
+        Street match for the tracker position. While the vehicle stays within
+        min_move_meters of the last lookup and its heading maps to the same side
+        of that street, the previous match is reused and only the time-derived
+        fields are recomputed by the caller.
+        """
+        if self._last_match is not None:
+            segments, last_lat, last_lon, last_rotation, last_result = self._last_match
+            bearing = last_result.get("bearing") if last_result else None
+            if (
+                segments is self._segments
+                and bearing is not None
+                and planar_distance_meters(last_lat, last_lon, lat, lon) < self._min_move_meters
+                and heading_side(bearing, rotation) == heading_side(bearing, last_rotation)
+            ):
+                return last_result
+
+        result = self._lookup_cache.lookup(
+            self._segments, lat, lon, rotation,
+            lambda: find_cleaning_data(self._segments, lat, lon, rotation, cursor=self._cursor),
+        )
+        self._last_match = (self._segments, lat, lon, rotation, result)
+        return result
+
+    def _find_neighborhood_file(self, lat: float, lon: float, index: NeighborhoodIndex | dict) -> str | None:
         """Return neighborhood file name if point is inside any polygon."""
         try:
-            for feat in index.get("features", []):
-                props = feat.get("properties", {})
-                fname = props.get("FileName")
-                geom = feat.get("geometry", {})
-                if not fname or geom.get("type") != "MultiPolygon":
-                    continue
-                if self._point_in_multipolygon(lat, lon, geom.get("coordinates", [])):
-                    return fname
+            if not isinstance(index, NeighborhoodIndex):
+                index = compile_neighborhoods(index)
+            # Fast path: a parked or slowly moving car rarely changes neighborhood between polls
+            if self._last_neighborhood and index.contains(self._last_neighborhood, lat, lon):
+                return self._last_neighborhood
+            fname = index.find(lat, lon)
+            if fname:
+                self._last_neighborhood = fname
+            return fname
         except Exception as err:
             _LOGGER.debug("Street cleaning: neighborhood detection failed: %s", err)
         return None
 
-    def _point_in_polygon(self, lat: float, lon: float, ring: list[list[float]]) -> bool:
-        """Ray casting for single polygon ring; ring is list of [lon, lat]."""
-        inside = False
-        n = len(ring)
-        for i in range(n):
-            x1, y1 = ring[i][0], ring[i][1]
-            x2, y2 = ring[(i + 1) % n][0], ring[(i + 1) % n][1]
-            if ((y1 > lat) != (y2 > lat)) and (lon < (x2 - x1) * (lat - y1) / (y2 - y1 + 1e-12) + x1):
-                inside = not inside
-        return inside
-
-    def _point_in_multipolygon(self, lat: float, lon: float, multipoly: list) -> bool:
-        """Check point in multipolygon (list of polygons; each polygon is list of rings)."""
-        for poly in multipoly:
-            if not poly:
-                continue
-            exterior = poly[0]
-            if self._point_in_polygon(lat, lon, exterior):
-                return True
-        return False
-    
     @property
     def native_value(self):
         """Return the state of the sensor."""
@@ -0,0 +1,375 @@
+"""
+Benchmark the geometry and sensor hot paths.
+
+Runs against a synthetic San Francisco-sized street grid (and matching
+neighborhood polygons) and, optionally, real GeoJSON files such as the ones
+the integration caches under .storage/sf_street_cleaning. Measures GeoJSON
+parse/compile time and peak memory, find_cleaning_data (cold, with a cursor
+and batched), _find_neighborhood_file and the sensor's full
+_update_sensor_state path, then writes the results as JSON so runs from
+different releases can be compared.
+
+    python scripts/benchmark.py --output bench_output.json
+    python scripts/benchmark.py --streets Marina.geojson --neighborhoods neighborhoods.geojson
+    python scripts/benchmark.py --baseline bench_output.json --output new.json
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import gzip
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# The sensor imports Home Assistant; use the same stand-in as the unit tests
+import tests.mock_homeassistant  # noqa: E402,F401
+
+from custom_components.sf_street_cleaning import alerts as alerts_mod  # noqa: E402
+from custom_components.sf_street_cleaning import geometry  # noqa: E402
+from custom_components.sf_street_cleaning import sensor as sensor_mod  # noqa: E402
+from custom_components.sf_street_cleaning.const import DOMAIN  # noqa: E402
+
+# Synthetic city: block size and south-west corner roughly matching San Francisco
+BLOCK_DEGREES = 0.0011
+CITY_ORIGIN = (-122.515, 37.708)
+DEFAULT_BLOCKS = 130  # ~33k street features / ~67k segments, on the order of the SF dataset
+QUICK_BLOCKS = 30
+NEIGHBORHOOD_GRID = (6, 7)  # 42 synthetic neighborhoods
+NEIGHBORHOOD_EDGE_POINTS = 40  # vertices per polygon edge
+SIDES = {"row": ("North", "South"), "col": ("East", "West")}
+
+
+def synthetic_city(blocks: int, seed: int = 1) -> dict:
+    """Street grid FeatureCollection with per-side weekly cleaning schedules."""
+    rng = random.Random(seed)
+    lon0, lat0 = CITY_ORIGIN
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    features = []
+
+    def side_info():
+        start = today + timedelta(days=rng.randrange(14), hours=rng.choice((6, 8, 9, 12)))
+        return {
+            "NextCleaning": start.isoformat(),
+            "NextNextCleaning": (start + timedelta(days=7)).isoformat(),
+            "FromHour": start.hour,
+            "ToHour": start.hour + 2,
+        }
+
+    for kind, outer, inner in (("row", blocks, blocks - 1), ("col", blocks, blocks - 1)):
+        for a in range(outer):
+            for b in range(inner):
+                if kind == "row":
+                    lat, lon = lat0 + a * BLOCK_DEGREES, lon0 + b * BLOCK_DEGREES
+                    coords = [[lon, lat], [lon + BLOCK_DEGREES / 2, lat], [lon + BLOCK_DEGREES, lat]]
+                else:
+                    lon, lat = lon0 + a * BLOCK_DEGREES, lat0 + b * BLOCK_DEGREES
+                    coords = [[lon, lat], [lon, lat + BLOCK_DEGREES / 2], [lon, lat + BLOCK_DEGREES]]
+                features.append({
+                    "type": "Feature",
+                    "properties": {
+                        "streetname": f"{kind.title()} {a}",
+                        "Sides": {side: side_info() for side in SIDES[kind]},
+                    },
+                    "geometry": {"type": "LineString", "coordinates": coords},
+                })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def synthetic_neighborhoods(blocks: int) -> dict:
+    """Neighborhoods index tiling the synthetic city with finely sampled rectangles."""
+    lon0, lat0 = CITY_ORIGIN
+    span = (blocks - 1) * BLOCK_DEGREES
+    cols, rows = NEIGHBORHOOD_GRID
+    features = []
+    for r in range(rows):
+        for c in range(cols):
+            west, east = lon0 + span * c / cols, lon0 + span * (c + 1) / cols
+            south, north = lat0 + span * r / rows, lat0 + span * (r + 1) / rows
+            corners = [(west, south), (east, south), (east, north), (west, north)]
+            ring = []
+            for (x1, y1), (x2, y2) in zip(corners, corners[1:] + corners[:1]):
+                for k in range(NEIGHBORHOOD_EDGE_POINTS):
+                    f = k / NEIGHBORHOOD_EDGE_POINTS
+                    ring.append([x1 + (x2 - x1) * f, y1 + (y2 - y1) * f])
+            ring.append(ring[0])
+            features.append({
+                "type": "Feature",
+                "properties": {"FileName": f"Area{r}_{c}"},
+                "geometry": {"type": "MultiPolygon", "coordinates": [[ring]]},
+            })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def read_body(path: Path) -> bytes:
+    data = path.read_bytes()
+    return gzip.decompress(data) if path.suffix == ".gz" else data
+
+
+def measure(fn, number: int, repeat: int = 5) -> dict:
+    """Best and median seconds per call over `repeat` rounds of `number` calls."""
+    fn()  # warm-up
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "best_us": min(rounds) * 1e6,
+        "median_us": statistics.median(rounds) * 1e6,
+    }
+
+
+def measure_memory(fn) -> tuple[object, dict]:
+    """Runs fn under tracemalloc; peak and retained bytes of what it allocates."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {"peak_bytes": peak, "retained_bytes": current}
+
+
+def street_bounds(store) -> tuple[float, float, float, float]:
+    lons = list(store.lon1) + list(store.lon2)
+    lats = list(store.lat1) + list(store.lat2)
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def random_points(bounds, count: int, seed: int) -> list[tuple[float, float, int]]:
+    rng = random.Random(seed)
+    min_lon, min_lat, max_lon, max_lat = bounds
+    return [
+        (rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon), rng.choice((0, 90, 180, 270)))
+        for _ in range(count)
+    ]
+
+
+def drive(bounds, count: int, seed: int, step: float = 0.00005) -> list[tuple[float, float, int]]:
+    """A vehicle wandering through the dataset, ~5 m between fixes."""
+    rng = random.Random(seed)
+    min_lon, min_lat, max_lon, max_lat = bounds
+    lat, lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+    course = 0
+    points = []
+    for _ in range(count):
+        if rng.random() < 0.02:
+            course = rng.choice((0, 90, 180, 270))
+        lat = min(max(lat + step * (course == 0) - step * (course == 180), min_lat), max_lat)
+        lon = min(max(lon + step * (course == 90) - step * (course == 270), min_lon), max_lon)
+        points.append((lat, lon, course))
+    return points
+
+
+def park(point, count: int, seed: int, jitter: float = 0.00002) -> list[tuple[float, float, int]]:
+    """A parked vehicle reporting GPS jitter (~2 m) around one spot."""
+    rng = random.Random(seed)
+    lat, lon, course = point
+    return [(lat + rng.uniform(-jitter, jitter), lon + rng.uniform(-jitter, jitter), course) for _ in range(count)]
+
+
+class _Tracker:
+    """Minimal device tracker state the sensor reads through hass.states.get()."""
+
+    def __init__(self, entity_id):
+        self.entity_id = entity_id
+        self.state = "not_home"
+        self.attributes = {"latitude": 0.0, "longitude": 0.0, "course": 0}
+
+    def get(self, entity_id):
+        return self if entity_id == self.entity_id else None
+
+
+def make_sensor(store, index):
+    tracker = _Tracker("device_tracker.bench")
+    hass = MagicMock()
+    hass.states = tracker
+    hass.data = {DOMAIN: {}}
+    sensor = sensor_mod.SFStreetCleaningSensor(
+        hass=hass,
+        device_tracker_id=tracker.entity_id,
+        geojson_url="bench",
+        neighborhoods_index=index,
+        segment_store=store,
+    )
+    sensor.async_write_ha_state = lambda: None
+    return sensor, tracker
+
+
+def bench_dataset(name: str, body: bytes, index_body: bytes | None, queries: int) -> dict:
+    results = {}
+
+    started = time.perf_counter()
+    parsed = json.loads(body)
+    parse_s = time.perf_counter() - started
+    started = time.perf_counter()
+    store = geometry.compile_segments(parsed)
+    compile_s = time.perf_counter() - started
+    del parsed
+    # The parsed GeoJSON is dropped once compiled, so what remains is the store itself
+    _, memory = measure_memory(lambda: geometry.compile_segments(json.loads(body)))
+    results["load"] = {
+        "geojson_bytes": len(body),
+        "segments": len(store),
+        "properties": len(store.properties),
+        "parse_s": parse_s,
+        "compile_s": compile_s,
+        "parse_compile_peak_bytes": memory["peak_bytes"],
+        "store_retained_bytes": memory["retained_bytes"],
+    }
+
+    bounds = street_bounds(store)
+    points = random_points(bounds, queries, seed=1)
+    cycle = itertools.cycle(points)
+
+    def cold():
+        lat, lon, rotation = next(cycle)
+        geometry.find_cleaning_data(store, lat, lon, rotation)
+    results["find_cleaning_data"] = measure(cold, number=len(points))
+
+    trip = drive(bounds, queries, seed=2)
+    cursor = geometry.SegmentCursor()
+    trip_cycle = itertools.cycle(trip)
+
+    def tracked():
+        lat, lon, rotation = next(trip_cycle)
+        geometry.find_cleaning_data(store, lat, lon, rotation, cursor=cursor)
+    results["find_cleaning_data_cursor"] = measure(tracked, number=len(trip))
+
+    # Scattered points (a fleet) and one dense trace (a replayed trip)
+    for bench, batch_points in (("find_cleaning_data_batch", points), ("find_cleaning_data_batch_trace", trip)):
+        lats, lons, rotations = (list(column) for column in zip(*batch_points))
+        batch = measure(lambda: geometry.find_cleaning_data_batch(store, lats, lons, rotations), number=1)
+        results[bench] = {**batch, "points": len(batch_points), "per_point_us": batch["best_us"] / len(batch_points)}
+
+    index = None
+    if index_body is not None:
+        started = time.perf_counter()
+        index = geometry.compile_neighborhoods(json.loads(index_body))
+        results["load"]["neighborhoods_compile_s"] = time.perf_counter() - started
+        results["load"]["neighborhood_polygons"] = len(index)
+
+        sensor, _ = make_sensor(store, index)
+
+        def locate():
+            lat, lon, _ = next(cycle)
+            sensor._last_neighborhood = None
+            sensor._find_neighborhood_file(lat, lon, index)
+        results["find_neighborhood_file"] = measure(locate, number=len(points))
+
+        def locate_sticky():
+            lat, lon, _ = next(trip_cycle)
+            sensor._find_neighborhood_file(lat, lon, index)
+        results["find_neighborhood_file_sticky"] = measure(locate_sticky, number=len(trip))
+
+    for scenario, fixes in (("driving", trip), ("parked", park(trip[-1], queries, seed=3))):
+        sensor, tracker = make_sensor(store, index)
+        fix_cycle = itertools.cycle(fixes)
+
+        def update():
+            lat, lon, course = next(fix_cycle)
+            tracker.attributes = {"latitude": lat, "longitude": lon, "course": course}
+            sensor._update_sensor_state()
+        results[f"update_sensor_state_{scenario}"] = measure(update, number=len(fixes))
+        if scenario == "parked":
+            cache = sensor._lookup_cache
+            results["update_sensor_state_parked"]["lookup_cache"] = {"hits": cache.hits, "misses": cache.misses}
+
+    return {name: results}
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict) -> list[str]:
+    """One line per timing present in both runs: baseline, current and ratio."""
+    lines = []
+    for dataset, benches in results["datasets"].items():
+        for bench, values in benches.items():
+            before = baseline.get("datasets", {}).get(dataset, {}).get(bench, {})
+            if "best_us" in values and "best_us" in before:
+                ratio = values["best_us"] / before["best_us"]
+                lines.append(f"{dataset}.{bench}: {before['best_us']:.1f} -> {values['best_us']:.1f} us ({ratio:.2f}x)")
+    return lines
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--quick", action="store_true", help="small synthetic city and fewer queries")
+    parser.add_argument("--blocks", type=int, help="synthetic city size in blocks per side")
+    parser.add_argument("--queries", type=int, help="query points per benchmark")
+    parser.add_argument("--streets", type=Path, action="append", default=[], help="street GeoJSON file (.gz ok)")
+    parser.add_argument("--neighborhoods", type=Path, help="neighborhoods index GeoJSON file (.gz ok)")
+    parser.add_argument("--no-numpy", action="store_true", help="measure the pure-Python fallback")
+    parser.add_argument("--baseline", type=Path, help="earlier results to compare against")
+    args = parser.parse_args(argv)
+
+    blocks = args.blocks or (QUICK_BLOCKS if args.quick else DEFAULT_BLOCKS)
+    queries = args.queries or (200 if args.quick else 2000)
+    index_body = read_body(args.neighborhoods) if args.neighborhoods else None
+
+    # Timers are not what is being measured
+    no_timer = lambda *_: (lambda: None)  # noqa: E731
+    with (
+        patch.object(geometry, "np", None if args.no_numpy else geometry.np),
+        patch.object(sensor_mod, "async_track_point_in_time", no_timer),
+        patch.object(alerts_mod, "async_track_point_in_time", no_timer),
+    ):
+        numpy_version = None if geometry.np is None else geometry.np.__version__
+        datasets = bench_dataset(
+            f"synthetic_{blocks}",
+            json.dumps(synthetic_city(blocks)).encode(),
+            json.dumps(synthetic_neighborhoods(blocks)).encode(),
+            queries,
+        )
+        for path in args.streets:
+            datasets.update(bench_dataset(path.name, read_body(path), index_body, queries))
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": numpy_version,
+        },
+        "datasets": datasets,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        for line in compare(results, json.loads(args.baseline.read_text())):
+            print(line, file=sys.stderr)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Build the offline snapshots bundled with release builds.
+
+Downloads the neighborhoods index and every neighborhood file listed in it,
+compiles each file into the integration's binary format (binary.py) and
+writes them gzip-compressed to custom_components/sf_street_cleaning/snapshots/.
+The integration falls back to these when it has no network and no cache, and
+refreshes them in the background once upstream is reachable. A neighborhood
+that fails to download is skipped (the integration fetches it on demand);
+the build only fails if the index or every neighborhood is unavailable.
+
+    python scripts/build_snapshot.py
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import sys
+import tempfile
+import types
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+COMPONENT_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "sf_street_cleaning"
+
+# Load the pure-Python modules without the package __init__, which needs Home Assistant
+_package = types.ModuleType("sf_street_cleaning")
+_package.__path__ = [str(COMPONENT_DIR)]
+sys.modules["sf_street_cleaning"] = _package
+const = importlib.import_module("sf_street_cleaning.const")
+geometry = importlib.import_module("sf_street_cleaning.geometry")
+binary = importlib.import_module("sf_street_cleaning.binary")
+
+
+def download(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=60) as resp:
+        return resp.read()
+
+
+def build(name: str, body: bytes, out_dir: Path) -> int:
+    store = geometry.compile_segments(json.loads(body))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.bin")
+        binary.export_segments(store, path, hashlib.sha1(body).hexdigest())
+        with open(path, "rb") as src, gzip.open(out_dir / f"{name}.bin.gz", "wb", compresslevel=9) as dst:
+            dst.write(src.read())
+    return len(store)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", type=Path, default=COMPONENT_DIR / "snapshots")
+    parser.add_argument("--jobs", type=int, default=const.CITYWIDE_MAX_CONCURRENT_DOWNLOADS)
+    args = parser.parse_args(argv)
+    args.out.mkdir(parents=True, exist_ok=True)
+
+    index_body = download(const.NEIGHBORHOODS_INDEX_URL)
+    with gzip.open(args.out / "neighborhoods.geojson.gz", "wb", compresslevel=9) as fh:
+        fh.write(index_body)
+    names = sorted(set(geometry.compile_neighborhoods(json.loads(index_body)).names))
+
+    def fetch_and_build(name: str) -> tuple[str, int | Exception]:
+        try:
+            body = download(const.NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file=name))
+            return name, build(name, body, args.out)
+        except Exception as err:
+            return name, err
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for name, count in pool.map(fetch_and_build, names):
+            if isinstance(count, Exception):
+                failed.append(name)
+                print(f"{name}: skipped ({count})", file=sys.stderr)
+            else:
+                print(f"{name}: {count} segments")
+    if failed and len(failed) == len(names):
+        sys.exit(f"no neighborhood could be built ({len(failed)} failed)")
+    if failed:
+        print(f"{len(failed)} of {len(names)} neighborhoods not bundled: {', '.join(failed)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,10 +17,17 @@ ha = create_mock_module("homeassistant")
 # Mock 'homeassistant.core'
 ha_core = create_mock_module("homeassistant.core")
 ha_core.callback = lambda x: x
+ha_core.CALLBACK_TYPE = object
 ha_core.HomeAssistant = MagicMock()
 class ServiceCall:
     pass
 ha_core.ServiceCall = ServiceCall
+ha_core.ServiceResponse = dict
+class SupportsResponse:
+    NONE = "none"
+    OPTIONAL = "optional"
+    ONLY = "only"
+ha_core.SupportsResponse = SupportsResponse
 class CoreState:
     NOT_RUNNING = "not_running"
     STARTING = "starting"
@@ -143,6 +150,14 @@ ha_util_us.METRIC_SYSTEM = UnitSystem()
 # Mock 'homeassistant.helpers'
 ha_helpers = create_mock_module("homeassistant.helpers")
 
+# Mock 'homeassistant.helpers.config_validation'
+ha_helpers_cv = create_mock_module("homeassistant.helpers.config_validation")
+ha_helpers_cv.config_entry_only_config_schema = lambda domain: None
+ha_helpers_cv.ensure_list = lambda value: value if isinstance(value, list) else [value]
+ha_helpers_cv.latitude = float
+ha_helpers_cv.longitude = float
+ha_helpers.config_validation = ha_helpers_cv
+
 # Mock 'homeassistant.helpers.aiohttp_client'
 ha_helpers_aiohttp = create_mock_module("homeassistant.helpers.aiohttp_client")
 ha_helpers_aiohttp.async_get_clientsession = MagicMock()
@@ -152,11 +167,12 @@ ha_helpers_aiohttp.async_create_clientsession = MagicMock()
 ha_helpers_event = create_mock_module("homeassistant.helpers.event")
 ha_helpers_event.async_track_time_interval = MagicMock()
 ha_helpers_event.async_track_state_change_event = MagicMock()
+ha_helpers_event.async_track_point_in_time = MagicMock()
 
 # Mock 'homeassistant.helpers.entity'
 ha_helpers_entity = create_mock_module("homeassistant.helpers.entity")
 class Entity:
-    pass
+    entity_id = None
 class DeviceInfo:
     def __init__(self, **kwargs):
         pass
@@ -186,6 +202,20 @@ ha_helpers_entity.EntityDescription = EntityDescription
 # Mock 'homeassistant.helpers.storage'
 ha_helpers_storage = create_mock_module("homeassistant.helpers.storage")
 ha_helpers_storage.STORAGE_DIR = ".storage"
+class Store:
+    """In-memory stand-in for homeassistant.helpers.storage.Store."""
+    def __init__(self, hass, version, key, **kwargs):
+        self.hass = hass
+        self.version = version
+        self.key = key
+        self.data = None
+    async def async_load(self):
+        return self.data
+    async def async_save(self, data):
+        self.data = data
+    def async_delay_save(self, data_func, delay=0):
+        self.data = data_func()
+ha_helpers_storage.Store = Store
 
 # Mock 'homeassistant.helpers.device_registry'
 ha_helpers_dr = create_mock_module("homeassistant.helpers.device_registry")
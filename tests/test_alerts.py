@@ -0,0 +1,100 @@
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Import the local mock FIRST before any potential HA imports
+import tests.mock_homeassistant as mock_ha
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from custom_components.sf_street_cleaning import alerts as alerts_mod
+from custom_components.sf_street_cleaning.const import EVENT_ALERT
+
+NOW = datetime(2026, 1, 5, 12, 0, tzinfo=timezone.utc)
+LEADS = [timedelta(minutes=m) for m in (1440, 120, 60, 30, 10)]
+
+
+class FakeTimers:
+    """Collects async_track_point_in_time calls so tests can fire them by hand."""
+
+    def __init__(self):
+        self.pending = []
+
+    def track(self, _hass, action, when):
+        entry = [when, action]
+        self.pending.append(entry)
+        return lambda: self.pending.remove(entry)
+
+    def run_until(self, until):
+        while self.pending:
+            entry = min(self.pending, key=lambda e: e[0])
+            if entry[0] > until:
+                return
+            self.pending.remove(entry)
+            entry[1](entry[0])
+
+
+class AlertSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.hass = MagicMock()
+        self.timers = FakeTimers()
+        patches = [
+            patch.object(alerts_mod, "async_track_point_in_time", self.timers.track),
+            patch.object(alerts_mod.dt_util, "utcnow", lambda: NOW),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.scheduler = alerts_mod.AlertScheduler(self.hass, LEADS)
+
+    def _fired(self):
+        return [c.args[1]["threshold_minutes"] for c in self.hass.bus.async_fire.call_args_list if c.args[0] == EVENT_ALERT]
+
+    def test_each_threshold_fires_once(self):
+        cleaning = NOW + timedelta(days=2)
+        self.scheduler.async_update(("Chestnut St", "North"), cleaning, {"street": "Chestnut St"})
+        self.assertEqual(len(self.timers.pending), 5)
+        # Repeated updates for the same session do not re-arm or duplicate timers
+        self.scheduler.async_update(("Chestnut St", "North"), cleaning, {"street": "Chestnut St"})
+        self.assertEqual(len(self.timers.pending), 5)
+
+        self.timers.run_until(cleaning)
+        self.assertEqual(self._fired(), [1440, 120, 60, 30, 10])
+        self.assertEqual(self.hass.bus.async_fire.call_args.args[1]["street"], "Chestnut St")
+
+        # Re-arming the same session after everything fired sends nothing new
+        self.scheduler.async_cancel()
+        self.scheduler.async_update(("Chestnut St", "North"), cleaning, {})
+        self.assertEqual(self.timers.pending, [])
+
+    def test_parking_close_to_cleaning_sends_most_urgent_alert_only(self):
+        cleaning = NOW + timedelta(minutes=45)
+        self.scheduler.async_update(("Chestnut St", "North"), cleaning, {})
+        self.timers.run_until(cleaning)
+        # 24h, 2h and 60 min had already passed: only 60 min is announced (after settling)
+        self.assertEqual(self._fired(), [60, 30, 10])
+
+    def test_leaving_before_settling_cancels_alerts(self):
+        cleaning = NOW + timedelta(minutes=20)
+        self.scheduler.async_update(("Chestnut St", "North"), cleaning, {})
+        self.scheduler.async_update(("Lombard St", "South"), NOW + timedelta(days=3), {})
+        self.timers.run_until(NOW + timedelta(hours=1))
+        self.assertEqual(self._fired(), [])
+
+    def test_tracker_dropout_keeps_fired_alerts(self):
+        cleaning = NOW + timedelta(hours=3)
+        self.scheduler.async_update(("Chestnut St", "North"), cleaning, {})
+        self.timers.run_until(cleaning - timedelta(minutes=90))
+        self.assertEqual(self._fired(), [1440, 120])
+        self.scheduler.async_update(None, None, {})
+        self.assertEqual(self.timers.pending, [])
+        self.scheduler.async_update(("Chestnut St", "North"), cleaning, {})
+        self.timers.run_until(cleaning)
+        self.assertEqual(self._fired(), [1440, 120, 60, 30, 10])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Import the local mock FIRST before any potential HA imports
+import tests.mock_homeassistant as mock_ha
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+_spec = importlib.util.spec_from_file_location("benchmark", repo_root / "scripts" / "benchmark.py")
+benchmark = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(benchmark)
+
+
+class BenchmarkRunnerTests(unittest.TestCase):
+    def test_quick_run_writes_json_and_compares(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.json")
+            results = benchmark.main(["--blocks", "6", "--queries", "10", "--output", output])
+            with open(output) as fh:
+                self.assertEqual(json.load(fh), json.loads(json.dumps(results)))
+
+        dataset = results["datasets"]["synthetic_6"]
+        self.assertGreater(dataset["load"]["segments"], 0)
+        self.assertGreater(dataset["load"]["parse_compile_peak_bytes"], 0)
+        for name in ("find_cleaning_data", "find_neighborhood_file", "update_sensor_state_driving"):
+            self.assertGreater(dataset[name]["best_us"], 0)
+        self.assertEqual(len(benchmark.compare(results, results)), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
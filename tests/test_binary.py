@@ -0,0 +1,73 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Import the local mock FIRST before any potential HA imports
+import tests.mock_homeassistant as mock_ha
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from custom_components.sf_street_cleaning import geometry
+from custom_components.sf_street_cleaning.binary import export_segments, load_segments
+from custom_components.sf_street_cleaning.geometry import compile_segments, find_cleaning_data
+from tests.test_geometry import make_street_grid
+
+
+class BinarySnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = os.path.join(self._tmp.name, "snapshot.bin")
+        geojson = make_street_grid()
+        geojson["features"][0]["properties"]["Sides"]["North"] = {
+            "NextCleaning": "2025-12-18T09:00:00-08:00",
+            "NextNextCleaning": "2026-01-15T09:00:00-08:00",
+        }
+        self.store = compile_segments(geojson)
+        export_segments(self.store, self.path, "abc")
+
+    def test_round_trip_matches_compiled_store(self):
+        loaded = load_segments(self.path, "abc")
+        self.assertEqual(len(loaded), len(self.store))
+        self.assertEqual(loaded.bounds, self.store.bounds)
+        self.assertEqual(len(loaded.properties), len(self.store.properties))
+        self.assertEqual(loaded.properties[0], self.store.properties[0])
+        self.assertEqual(
+            [list(column) for column in loaded.schedules[0]["North"]],
+            [list(column) for column in self.store.schedules[0]["North"]],
+        )
+
+        rng = random.Random(5)
+        for np_module in (geometry.np, None):
+            with patch.object(geometry, "np", np_module):
+                for _ in range(100):
+                    lat, lon = rng.uniform(37.785, 37.81), rng.uniform(-122.455, -122.43)
+                    rotation = rng.choice([0, 90, 180, 270])
+                    expected = find_cleaning_data(self.store, lat, lon, rotation)
+                    result = find_cleaning_data(loaded, lat, lon, rotation)
+                    self.assertEqual(result["street"], expected["street"])
+                    self.assertEqual(result["parkedOnSide"], expected["parkedOnSide"])
+                    self.assertAlmostEqual(result["distance"], expected["distance"], places=9)
+
+    def test_rejects_other_source_version_and_missing_file(self):
+        self.assertIsNone(load_segments(self.path, "other"))
+        self.assertIsNone(load_segments(os.path.join(self._tmp.name, "missing.bin")))
+        with open(self.path, "r+b") as fh:
+            fh.seek(4)
+            fh.write(b"\xff\xff")
+        self.assertIsNone(load_segments(self.path))
+
+    def test_empty_store(self):
+        export_segments(compile_segments({}), self.path, "empty")
+        loaded = load_segments(self.path, "empty")
+        self.assertEqual(len(loaded), 0)
+        self.assertIsNone(find_cleaning_data(loaded, 37.8, -122.44, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import asyncio
+import importlib.util
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Import the local mock FIRST before any potential HA imports
+import tests.mock_homeassistant as mock_ha
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from custom_components.sf_street_cleaning import cache as cache_mod
+from custom_components.sf_street_cleaning.coordinator import async_get_coordinator
+from custom_components.sf_street_cleaning.const import NEIGHBORHOOD_FILE_URL_TEMPLATE, NEIGHBORHOODS_INDEX_URL
+from tests.test_cache import make_hass, neighborhood, street
+
+_spec = importlib.util.spec_from_file_location("build_snapshot", repo_root / "scripts" / "build_snapshot.py")
+build_snapshot = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(build_snapshot)
+
+
+class OfflineSession:
+    def get(self, url, headers=None):
+        raise RuntimeError("offline")
+
+
+class BuildSnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.out = Path(self._tmp.name) / "snapshots"
+        index = {"features": [neighborhood("Marina", -122.45), neighborhood("Cow Hollow", -122.44)]}
+        marina = {"features": [street("Chestnut St", [[-122.45, 37.795], [-122.44, 37.795]])]}
+        self.bodies = {
+            NEIGHBORHOODS_INDEX_URL: json.dumps(index).encode(),
+            NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Marina"): json.dumps(marina).encode(),
+        }
+
+    def _download(self, url):
+        if url not in self.bodies:
+            raise OSError("HTTP Error 502")
+        return self.bodies[url]
+
+    def _build(self):
+        with patch.object(build_snapshot, "download", self._download):
+            build_snapshot.main(["--out", str(self.out), "--jobs", "2"])
+
+    def test_failed_neighborhood_is_skipped(self):
+        self._build()
+        self.assertEqual(sorted(p.name for p in self.out.iterdir()), ["Marina.bin.gz", "neighborhoods.geojson.gz"])
+
+        # The integration serves the snapshot offline
+        coordinator = async_get_coordinator(make_hass(self._tmp.name))
+        with patch.object(cache_mod, "BUNDLED_DIR", str(self.out)), \
+                patch.object(cache_mod, "async_get_clientsession", return_value=OfflineSession()):
+            segments = asyncio.run(coordinator.async_load_cached_segments(NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Marina")))
+            index = asyncio.run(coordinator.async_get_neighborhoods())
+        self.assertEqual(segments.properties[0]["streetname"], "Chestnut St")
+        self.assertEqual(index.find(37.795, -122.435), "Cow Hollow")
+
+    def test_fails_when_no_neighborhood_builds(self):
+        del self.bodies[NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Marina")]
+        with self.assertRaises(SystemExit) as raised:
+            self._build()
+        self.assertIn("2 failed", str(raised.exception.code))
+
+    def test_fails_without_index(self):
+        del self.bodies[NEIGHBORHOODS_INDEX_URL]
+        with self.assertRaises(OSError):
+            self._build()
+
+
+if __name__ == "__main__":
+    unittest.main()
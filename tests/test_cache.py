@@ -0,0 +1,465 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Import the local mock FIRST before any potential HA imports
+import tests.mock_homeassistant as mock_ha
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from custom_components.sf_street_cleaning import cache as cache_mod
+from custom_components.sf_street_cleaning import sensor as sensor_mod
+from custom_components.sf_street_cleaning.binary import export_segments
+from custom_components.sf_street_cleaning.geometry import compile_segments
+from custom_components.sf_street_cleaning.coordinator import async_get_coordinator, dataset_url
+from custom_components.sf_street_cleaning.const import (
+    ATTR_STREET,
+    CITYWIDE_URL,
+    DOMAIN,
+    NEIGHBORHOOD_FILE_URL_TEMPLATE,
+    NEIGHBORHOODS_INDEX_URL,
+)
+
+GEOJSON = b'{"type": "FeatureCollection", "features": [{"properties": {"streetname": "Chestnut St", "Sides": {}}, "geometry": {"type": "LineString", "coordinates": [[-122.44, 37.80], [-122.43, 37.80]]}}]}'
+URL = "https://example.invalid/Marina.geojson"
+
+
+class FakeResponse:
+    def __init__(self, status, body=b"", headers=None):
+        self.status = status
+        self._body = body
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(self.status)
+
+    async def read(self):
+        return self._body
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses.pop(0)
+
+
+class RoutingSession:
+    """FakeSession keyed by URL, for requests issued concurrently."""
+
+    def __init__(self, routes):
+        self.routes = {url: list(responses) for url, responses in routes.items()}
+        self.requests = []
+
+    def get(self, url, headers=None):
+        self.requests.append((url, dict(headers or {})))
+        return self.routes[url].pop(0)
+
+
+def neighborhood(name, x0):
+    square = [[x0, 37.79], [x0 + 0.01, 37.79], [x0 + 0.01, 37.80], [x0, 37.80], [x0, 37.79]]
+    return {"properties": {"FileName": name}, "geometry": {"type": "MultiPolygon", "coordinates": [[square]]}}
+
+
+def street(name, coords):
+    return {"properties": {"streetname": name, "Sides": {}}, "geometry": {"type": "LineString", "coordinates": coords}}
+
+
+def make_hass(config_dir):
+    hass = MagicMock()
+    hass.data = {DOMAIN: {}}
+    hass.config.path = lambda *parts: os.path.join(config_dir, *parts)
+
+    async def run_in_executor(func, *args):
+        return func(*args)
+
+    hass.async_add_executor_job = run_in_executor
+    return hass
+
+
+class GeoJSONCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.hass = make_hass(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _refresh(self, session):
+        with patch.object(cache_mod, "async_get_clientsession", return_value=session):
+            return asyncio.run(async_get_coordinator(self.hass).async_refresh_segments(URL))
+
+    def test_not_modified_keeps_loaded_segments(self):
+        session = FakeSession([
+            FakeResponse(200, GEOJSON, {"ETag": '"abc"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}),
+            FakeResponse(304),
+        ])
+        updates = []
+        async_get_coordinator(self.hass).async_add_listener(updates.append)
+        first = self._refresh(session)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(updates, [URL])
+        self.assertEqual(session.requests[0][1], {})
+
+        second = self._refresh(session)
+        self.assertIs(second, first)
+        self.assertEqual(updates, [URL], "a 304 should not notify listeners")
+        self.assertEqual(session.requests[1][1]["If-None-Match"], '"abc"')
+        self.assertEqual(session.requests[1][1]["If-Modified-Since"], "Wed, 01 Jan 2025 00:00:00 GMT")
+
+    def test_identical_body_keeps_loaded_segments(self):
+        # No validators, so upstream answers 200 with the same bytes every day
+        session = FakeSession([FakeResponse(200, GEOJSON), FakeResponse(200, GEOJSON)])
+        updates = []
+        async_get_coordinator(self.hass).async_add_listener(updates.append)
+        first = self._refresh(session)
+        with patch.object(cache_mod, "parse_and_compile_segments") as parse:
+            second = self._refresh(session)
+        parse.assert_not_called()
+        self.assertIs(second, first)
+        self.assertEqual(updates, [URL])
+        self.assertEqual(async_get_coordinator(self.hass).disk_cache._entries[URL]["sha1"], first.source)
+
+    def test_concurrent_refreshes_share_one_download(self):
+        session = FakeSession([FakeResponse(200, GEOJSON)])
+        coordinator = async_get_coordinator(self.hass)
+
+        async def refresh_many():
+            return await asyncio.gather(*(coordinator.async_refresh_segments(URL) for _ in range(5)))
+
+        with patch.object(cache_mod, "async_get_clientsession", return_value=session):
+            results = asyncio.run(refresh_many())
+        self.assertEqual(len(session.requests), 1)
+        self.assertTrue(all(segments is results[0] for segments in results))
+        self.assertEqual(coordinator._in_flight, {})
+
+    def test_startup_loads_from_disk(self):
+        session = FakeSession([FakeResponse(200, GEOJSON, {"ETag": '"abc"'})])
+        self._refresh(session)
+
+        # Simulate a restart: fresh hass.data but the same Store contents and files on disk
+        entries = async_get_coordinator(self.hass).disk_cache._entries
+        restarted = make_hass(self._tmp.name)
+        coordinator = async_get_coordinator(restarted)
+        coordinator.disk_cache._store.data = entries
+        segments = asyncio.run(coordinator.async_load_cached_segments(URL))
+        self.assertEqual(len(segments), 1)
+        self.assertIs(coordinator.segments(URL), segments)
+        # Served from the memory-mapped snapshot rather than re-parsing the GeoJSON
+        self.assertIsNotNone(segments._mmap)
+        self.assertEqual(segments.properties[0]["streetname"], "Chestnut St")
+
+    def test_restart_offline_keeps_revalidating_disk_data(self):
+        session = FakeSession([FakeResponse(200, GEOJSON, {"ETag": '"abc"'})])
+        self._refresh(session)
+        entries = async_get_coordinator(self.hass).disk_cache._entries
+        entries[URL]["fetched_at"] = (datetime.now(timezone.utc) - timedelta(hours=30)).isoformat()
+
+        class OfflineSession:
+            requests = 0
+
+            def get(self, url, headers=None):
+                OfflineSession.requests += 1
+                raise RuntimeError("offline")
+
+        restarted = make_hass(self._tmp.name)
+        coordinator = async_get_coordinator(restarted)
+        coordinator.disk_cache._store.data = entries
+        with patch.object(cache_mod, "async_get_clientsession", return_value=OfflineSession()):
+            asyncio.run(coordinator.async_load_segments(URL))
+            self.assertEqual(OfflineSession.requests, 1)
+            # The disk copy keeps its age, so every poll retries upstream
+            self.assertFalse(coordinator.segment_cache.is_fresh(URL, datetime.now(timezone.utc)))
+            for _ in range(3):
+                self.assertEqual(len(asyncio.run(coordinator.async_get_segments(URL))), 1)
+        self.assertEqual(OfflineSession.requests, 4)
+
+    def test_not_modified_after_restart_maps_snapshot(self):
+        session = FakeSession([FakeResponse(200, GEOJSON, {"ETag": '"abc"'}), FakeResponse(304), FakeResponse(304)])
+        self._refresh(session)
+        entries = async_get_coordinator(self.hass).disk_cache._entries
+        # Past the TTL, so async_get_segments revalidates too
+        entries[URL]["fetched_at"] = (datetime.now(timezone.utc) - timedelta(hours=30)).isoformat()
+
+        for refresh in ("async_get_segments", "async_refresh_segments"):
+            restarted = make_hass(self._tmp.name)
+            coordinator = async_get_coordinator(restarted)
+            coordinator.disk_cache._store.data = entries
+            with patch.object(cache_mod, "async_get_clientsession", return_value=session), \
+                    patch.object(cache_mod, "parse_and_compile_segments") as parse:
+                segments = asyncio.run(getattr(coordinator, refresh)(URL))
+            parse.assert_not_called()
+            self.assertIsNotNone(segments._mmap)
+        self.assertEqual(session.responses, [])
+
+    def test_stale_snapshot_falls_back_to_geojson(self):
+        session = FakeSession([FakeResponse(200, GEOJSON)])
+        self._refresh(session)
+        entries = async_get_coordinator(self.hass).disk_cache._entries
+        entries[URL]["sha1"] = "0" * 40
+
+        restarted = make_hass(self._tmp.name)
+        coordinator = async_get_coordinator(restarted)
+        coordinator.disk_cache._store.data = entries
+        segments = asyncio.run(coordinator.async_load_cached_segments(URL))
+        self.assertIsNone(segments._mmap)
+        self.assertNotEqual(coordinator.disk_cache._entries[URL]["sha1"], "0" * 40)
+
+
+class CitywideTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.hass = make_hass(self._tmp.name)
+
+    def test_merges_neighborhoods_and_dedupes_boundary_segments(self):
+        index = {"features": [neighborhood("Marina", -122.45), neighborhood("Cow Hollow", -122.44)]}
+        boundary = [[-122.44, 37.79], [-122.44, 37.80]]
+        marina = {"features": [street("Boundary St", boundary), street("Chestnut St", [[-122.45, 37.795], [-122.44, 37.795]])]}
+        # Same boundary segment, digitised in the opposite direction
+        cow_hollow = {"features": [street("Boundary St", boundary[::-1]), street("Union St", [[-122.44, 37.797], [-122.43, 37.797]])]}
+        marina_url = NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Marina")
+        cow_hollow_url = NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Cow Hollow")
+        session = RoutingSession({
+            NEIGHBORHOODS_INDEX_URL: [FakeResponse(200, json.dumps(index).encode())],
+            marina_url: [FakeResponse(200, json.dumps(marina).encode(), {"ETag": '"m"'}), FakeResponse(304)],
+            cow_hollow_url: [FakeResponse(200, json.dumps(cow_hollow).encode(), {"ETag": '"c"'}), FakeResponse(304)],
+        })
+        coordinator = async_get_coordinator(self.hass)
+
+        with patch.object(cache_mod, "async_get_clientsession", return_value=session):
+            merged = asyncio.run(coordinator.async_refresh_segments(CITYWIDE_URL))
+            self.assertEqual(len(merged), 3)
+            self.assertEqual(
+                sorted(merged.properties[merged.prop_id[i]]["streetname"] for i in range(len(merged))),
+                ["Boundary St", "Chestnut St", "Union St"],
+            )
+            # Served from the snapshot just written, not from decoded rows in memory
+            self.assertIsNotNone(merged._mmap)
+            # Nothing changed upstream: the merged store is kept as is
+            again = asyncio.run(coordinator.async_refresh_segments(CITYWIDE_URL))
+            self.assertIs(again, merged)
+
+        # Restarts map the merged snapshot directly
+        restarted = make_hass(self._tmp.name)
+        restarted_coordinator = async_get_coordinator(restarted)
+        restarted_coordinator.disk_cache._store.data = coordinator.disk_cache._entries
+        mapped = asyncio.run(restarted_coordinator.async_load_cached_segments(CITYWIDE_URL))
+        self.assertEqual(len(mapped), 3)
+        self.assertIsNotNone(mapped._mmap)
+
+    def test_only_changed_neighborhoods_are_reparsed(self):
+        index = {"features": [neighborhood("Marina", -122.45), neighborhood("Cow Hollow", -122.44)]}
+        marina = json.dumps({"features": [street("Chestnut St", [[-122.45, 37.795], [-122.44, 37.795]])]}).encode()
+        cow_hollow = json.dumps({"features": [street("Union St", [[-122.44, 37.797], [-122.43, 37.797]])]}).encode()
+        cow_hollow_v2 = json.dumps({"features": [street("Green St", [[-122.44, 37.798], [-122.43, 37.798]])]}).encode()
+        session = RoutingSession({
+            NEIGHBORHOODS_INDEX_URL: [FakeResponse(200, json.dumps(index).encode())],
+            # No validators upstream: every refresh is a full 200
+            NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Marina"): [FakeResponse(200, marina)] * 2,
+            NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Cow Hollow"): [FakeResponse(200, cow_hollow), FakeResponse(200, cow_hollow_v2)],
+        })
+        coordinator = async_get_coordinator(self.hass)
+        parsed = []
+        original = cache_mod.parse_and_compile_segments
+
+        def counting_parse(body):
+            parsed.append(body)
+            return original(body)
+
+        with patch.object(cache_mod, "async_get_clientsession", return_value=session), \
+                patch.object(cache_mod, "parse_and_compile_segments", counting_parse):
+            asyncio.run(coordinator.async_refresh_segments(CITYWIDE_URL))
+            self.assertEqual(len(parsed), 2)
+            merged = asyncio.run(coordinator.async_refresh_segments(CITYWIDE_URL))
+        # Marina's body was byte-identical, so only Cow Hollow was parsed again
+        self.assertEqual(parsed[2:], [cow_hollow_v2])
+        names = sorted(merged.properties[merged.prop_id[i]]["streetname"] for i in range(len(merged)))
+        self.assertEqual(names, ["Chestnut St", "Green St"])
+
+    def test_malformed_neighborhood_falls_back_to_its_snapshot(self):
+        index = {"features": [neighborhood("Marina", -122.45), neighborhood("Cow Hollow", -122.44)]}
+        marina_url = NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Marina")
+        cow_hollow_url = NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Cow Hollow")
+        marina = json.dumps({"features": [street("Chestnut St", [[-122.45, 37.795], [-122.44, 37.795]])]}).encode()
+        cow_hollow = json.dumps({"features": [street("Union St", [[-122.44, 37.797], [-122.43, 37.797]])]}).encode()
+        session = RoutingSession({
+            NEIGHBORHOODS_INDEX_URL: [FakeResponse(200, json.dumps(index).encode())],
+            marina_url: [FakeResponse(200, marina, {"ETag": '"m1"'}), FakeResponse(200, b'{"features": [', {"ETag": '"m2"'}), FakeResponse(304)],
+            cow_hollow_url: [FakeResponse(200, cow_hollow, {"ETag": '"c"'}), FakeResponse(304), FakeResponse(304)],
+        })
+        coordinator = async_get_coordinator(self.hass)
+        with patch.object(cache_mod, "async_get_clientsession", return_value=session):
+            asyncio.run(coordinator.async_refresh_segments(CITYWIDE_URL))
+            digest = coordinator.disk_cache._entries[marina_url]["sha1"]
+            # A truncated Marina body keeps Marina's last good snapshot, then so does the 304 after it
+            for _ in range(2):
+                merged = asyncio.run(coordinator.async_refresh_segments(CITYWIDE_URL))
+                names = sorted(merged.properties[merged.prop_id[i]]["streetname"] for i in range(len(merged)))
+                self.assertEqual(names, ["Chestnut St", "Union St"])
+                self.assertEqual(coordinator.disk_cache._entries[marina_url]["sha1"], digest)
+
+
+class BundledSnapshotTests(unittest.TestCase):
+    def test_offline_install_uses_bundled_snapshots(self):
+        with tempfile.TemporaryDirectory() as config_dir, tempfile.TemporaryDirectory() as bundled_dir:
+            index = {"features": [neighborhood("Marina", -122.45)]}
+            with gzip.open(os.path.join(bundled_dir, cache_mod.BUNDLED_INDEX), "wb") as fh:
+                fh.write(json.dumps(index).encode())
+            raw = os.path.join(bundled_dir, "Marina.bin")
+            export_segments(compile_segments(json.loads(GEOJSON)), raw, "bundled-sha1")
+            with open(raw, "rb") as src, gzip.open(raw + ".gz", "wb") as dst:
+                dst.write(src.read())
+
+            class OfflineSession:
+                def get(self, url, headers=None):
+                    raise RuntimeError("offline")
+
+            coordinator = async_get_coordinator(make_hass(config_dir))
+            marina_url = NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Marina")
+            with patch.object(cache_mod, "BUNDLED_DIR", bundled_dir), \
+                    patch.object(cache_mod, "async_get_clientsession", return_value=OfflineSession()):
+                segments = asyncio.run(coordinator.async_load_cached_segments(marina_url))
+                self.assertEqual(segments.properties[0]["streetname"], "Chestnut St")
+                self.assertEqual(segments.source, "bundled-sha1")
+                # Bundled data has no known age, so the next poll revalidates it
+                self.assertFalse(coordinator.segment_cache.is_fresh(marina_url, datetime.now(timezone.utc)))
+                citywide = asyncio.run(coordinator.async_refresh_segments(CITYWIDE_URL))
+                self.assertEqual(len(citywide), 1)
+
+
+class AutoDetectTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.hass = make_hass(self._tmp.name)
+        self.tracker = MagicMock(attributes={"latitude": 37.795, "longitude": -122.445})
+        self.hass.states.get = lambda entity_id: self.tracker
+
+    def test_sensor_follows_tracker_across_neighborhoods(self):
+        index = {"features": [neighborhood("Marina", -122.45), neighborhood("Cow Hollow", -122.44)]}
+        marina = {"features": [street("Chestnut St", [[-122.45, 37.795], [-122.44, 37.795]])]}
+        cow_hollow = {"features": [street("Union St", [[-122.44, 37.797], [-122.43, 37.797]])]}
+        marina_url = NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Marina")
+        cow_hollow_url = NEIGHBORHOOD_FILE_URL_TEMPLATE.format(file="Cow Hollow")
+        session = RoutingSession({
+            NEIGHBORHOODS_INDEX_URL: [FakeResponse(200, json.dumps(index).encode())],
+            marina_url: [FakeResponse(200, json.dumps(marina).encode())],
+            cow_hollow_url: [FakeResponse(200, json.dumps(cow_hollow).encode())],
+        })
+        # No URL configured: the entry auto-detects its neighborhood
+        url = dataset_url({"device_tracker_id": "device_tracker.car"})
+        self.assertIsNone(url)
+        sensor = sensor_mod.SFStreetCleaningSensor(self.hass, "device_tracker.car", url, None)
+        sensor.async_update_ha_state = MagicMock()
+        sensor.async_write_ha_state = MagicMock()
+
+        async def drive():
+            await sensor.async_update()
+            in_marina = sensor._segments
+            self.assertEqual(in_marina.properties[0]["streetname"], "Chestnut St")
+
+            # Crossing into Cow Hollow asks for a refresh with that neighborhood's data
+            self.tracker.attributes = {"latitude": 37.797, "longitude": -122.435}
+            sensor._async_on_tracker_update(None)
+            sensor.async_update_ha_state.assert_called_once_with(force_refresh=True)
+            await sensor.async_update()
+            self.assertEqual(sensor._segments.properties[0]["streetname"], "Union St")
+
+            # Driving back is served from the coordinator's segment cache
+            self.tracker.attributes = {"latitude": 37.795, "longitude": -122.445}
+            await sensor.async_update()
+            self.assertIs(sensor._segments, in_marina)
+
+        with patch.object(cache_mod, "async_get_clientsession", return_value=session), \
+                patch.object(sensor_mod, "async_track_point_in_time"):
+            asyncio.run(drive())
+        self.assertEqual([request[0] for request in session.requests], [NEIGHBORHOODS_INDEX_URL, marina_url, cow_hollow_url])
+
+    def test_offline_install_detects_neighborhood_from_bundled_snapshots(self):
+        with tempfile.TemporaryDirectory() as bundled_dir:
+            index = {"features": [neighborhood("Marina", -122.45), neighborhood("Cow Hollow", -122.44)]}
+            with gzip.open(os.path.join(bundled_dir, cache_mod.BUNDLED_INDEX), "wb") as fh:
+                fh.write(json.dumps(index).encode())
+            raw = os.path.join(bundled_dir, "Marina.bin")
+            marina = {"features": [street("Chestnut St", [[-122.45, 37.795], [-122.44, 37.795]])]}
+            export_segments(compile_segments(marina), raw, "bundled-sha1")
+            with open(raw, "rb") as src, gzip.open(raw + ".gz", "wb") as dst:
+                dst.write(src.read())
+
+            class OfflineSession:
+                def get(self, url, headers=None):
+                    raise RuntimeError("offline")
+
+            sensor = sensor_mod.SFStreetCleaningSensor(self.hass, "device_tracker.car", None, None)
+            sensor.async_write_ha_state = MagicMock()
+            with patch.object(cache_mod, "BUNDLED_DIR", bundled_dir), \
+                    patch.object(cache_mod, "async_get_clientsession", return_value=OfflineSession()), \
+                    patch.object(sensor_mod, "async_track_point_in_time"):
+                asyncio.run(sensor.async_update())
+        self.assertEqual(sensor._segments.source, "bundled-sha1")
+        self.assertNotEqual(sensor.native_value, "Out of Coverage")
+        self.assertEqual(sensor._attributes[ATTR_STREET], "Chestnut St")
+
+
+class SegmentCacheTests(unittest.TestCase):
+    def _segments(self, count):
+        store = MagicMock()
+        store.__len__.return_value = count
+        return store
+
+    def test_lru_eviction_by_entries_and_segments(self):
+        now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        cache = cache_mod.SegmentCache(max_entries=2, max_segments=100)
+        cache.put("a", self._segments(10), now)
+        cache.put("b", self._segments(10), now)
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", self._segments(10), now)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+
+        cache.put("d", self._segments(95), now)
+        self.assertEqual(len(cache), 1)
+        self.assertIn("d", cache)
+
+    def test_entries_expire_independently(self):
+        now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        cache = cache_mod.SegmentCache(ttl=timedelta(hours=24))
+        cache.put("marina", self._segments(1), now)
+        cache.put("mission", self._segments(1), now + timedelta(hours=12))
+        later = now + timedelta(hours=30)
+        self.assertFalse(cache.is_fresh("marina", later))
+        self.assertTrue(cache.is_fresh("mission", later))
+        cache.touch("marina", later)
+        self.assertTrue(cache.is_fresh("marina", later))
+
+    def test_unknown_age_is_expired(self):
+        now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        cache = cache_mod.SegmentCache()
+        cache.put("bundled", self._segments(1), None)
+        self.assertIsNotNone(cache.get("bundled"))
+        self.assertFalse(cache.is_fresh("bundled", now))
+        cache.touch("bundled", now)
+        self.assertTrue(cache.is_fresh("bundled", now))
+
+
+if __name__ == "__main__":
+    unittest.main()
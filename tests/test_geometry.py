@@ -0,0 +1,267 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Import the local mock FIRST before any potential HA imports
+import tests.mock_homeassistant as mock_ha
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from custom_components.sf_street_cleaning import geometry
+from custom_components.sf_street_cleaning.geometry import (
+    LookupCache,
+    compile_segments,
+    distance_point_to_segment_meters,
+    find_cleaning_data,
+    find_cleaning_data_batch,
+    heading_side,
+    rotation_bucket,
+)
+
+
+def make_street_grid(rows=12, cols=12, spacing=0.0011, origin=(-122.45, 37.79)):
+    """Synthetic Manhattan-style block grid of two-segment LineStrings."""
+    lon0, lat0 = origin
+    features = []
+    for r in range(rows):
+        lat = lat0 + r * spacing
+        for c in range(cols - 1):
+            lon = lon0 + c * spacing
+            features.append({
+                "properties": {"streetname": f"Row {r}", "Sides": {"North": {"NextCleaning": "Unknown"}, "South": {"NextCleaning": "Unknown"}}},
+                "geometry": {"type": "LineString", "coordinates": [[lon, lat], [lon + spacing / 2, lat], [lon + spacing, lat]]},
+            })
+    for c in range(cols):
+        lon = lon0 + c * spacing
+        for r in range(rows - 1):
+            lat = lat0 + r * spacing
+            features.append({
+                "properties": {"streetname": f"Col {c}", "Sides": {"East": {"NextCleaning": "Unknown"}, "West": {"NextCleaning": "Unknown"}}},
+                "geometry": {"type": "LineString", "coordinates": [[lon, lat], [lon, lat + spacing]]},
+            })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def brute_force_nearest(geojson, lat, lon):
+    best = (None, float("inf"))
+    for feature in geojson["features"]:
+        coords = feature["geometry"]["coordinates"]
+        for p1, p2 in zip(coords, coords[1:]):
+            dist = distance_point_to_segment_meters(lon, lat, p1[0], p1[1], p2[0], p2[1])
+            if dist < best[1]:
+                best = (feature, dist)
+    return best
+
+
+class SegmentStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.geojson = make_street_grid()
+        self.store = compile_segments(self.geojson)
+
+    def test_matches_linear_scan(self):
+        self._assert_matches_linear_scan()
+
+    def test_scalar_fallback_matches_linear_scan(self):
+        with patch.object(geometry, "np", None):
+            self._assert_matches_linear_scan()
+
+    @unittest.skipIf(geometry.np is None, "NumPy not installed")
+    def test_vectorized_distances_match_scalar(self):
+        ids = geometry.np.arange(len(self.store))
+        dists = geometry.segment_distances(self.store, ids, 37.8, -122.44)
+        for i in range(len(self.store)):
+            self.assertAlmostEqual(dists[i], self.store.segment_distance(i, 37.8, -122.44), places=6)
+
+    def test_projected_columns(self):
+        for i in range(len(self.store)):
+            self.assertAlmostEqual(self.store.ux[i] ** 2 + self.store.uy[i] ** 2, 1.0, places=12)
+            dlon, y = self.store.project(self.store.lat1[i], self.store.lon1[i])
+            self.assertAlmostEqual(dlon * self.store.m_per_deg_lon[i], self.store.x1[i], places=6)
+            self.assertAlmostEqual(y, self.store.y1[i], places=6)
+
+    def test_zero_length_segment_projects_onto_its_start(self):
+        store = compile_segments({"features": [{
+            "properties": {"streetname": "Dot"},
+            "geometry": {"type": "LineString", "coordinates": [[-122.44, 37.8], [-122.44, 37.8]]},
+        }]})
+        self.assertEqual((store.ux[0], store.uy[0], store.length[0]), (0.0, 0.0, 0.0))
+        expected = distance_point_to_segment_meters(-122.4399, 37.8001, -122.44, 37.8, -122.44, 37.8)
+        for np_module in (geometry.np, None):
+            with patch.object(geometry, "np", np_module):
+                self.assertAlmostEqual(store.nearest(37.8001, -122.4399)[1], expected, places=6)
+
+    def _assert_matches_linear_scan(self):
+        rng = random.Random(1234)
+        for _ in range(300):
+            lat = rng.uniform(37.785, 37.81)
+            lon = rng.uniform(-122.455, -122.43)
+            expected_feature, expected_dist = brute_force_nearest(self.geojson, lat, lon)
+            seg_id, dist = self.store.nearest(lat, lon)
+            props = self.store.properties[self.store.prop_id[seg_id]]
+            self.assertAlmostEqual(dist, expected_dist, places=6)
+            self.assertEqual(props["streetname"], expected_feature["properties"]["streetname"])
+
+    def test_point_far_outside_grid(self):
+        expected_feature, expected_dist = brute_force_nearest(self.geojson, 37.70, -122.50)
+        _, dist = self.store.nearest(37.70, -122.50)
+        self.assertAlmostEqual(dist, expected_dist, places=6)
+
+    def test_batch_matches_single_lookups(self):
+        rng = random.Random(99)
+        lats = [rng.uniform(37.785, 37.81) for _ in range(200)] + [37.70, 37.79 + 0.0011 * 3]
+        lons = [rng.uniform(-122.455, -122.43) for _ in range(200)] + [-122.50, -122.45 + 0.0011 * 3]
+        rotations = [rng.choice([0, 90, 180, 270]) for _ in lats]
+        batch = find_cleaning_data_batch(self.store, lats, lons, rotations)
+        self.assertEqual(len(batch), len(lats))
+        for result, lat, lon, rotation in zip(batch, lats, lons, rotations):
+            single = find_cleaning_data(self.store, lat, lon, rotation)
+            self.assertEqual(result["street"], single["street"])
+            self.assertEqual(result["parkedOnSide"], single["parkedOnSide"])
+            self.assertAlmostEqual(result["distance"], single["distance"], places=6)
+
+    @unittest.skipIf(geometry.np is None, "NumPy not installed")
+    def test_batch_groups_only_dense_queries(self):
+        rng = random.Random(5)
+        # Fleet: scattered points, hardly two in one grid cell
+        fleet = [(rng.uniform(37.785, 37.81), rng.uniform(-122.455, -122.43)) for _ in range(40)]
+        # Trace: many points packed into a few cells
+        trace = [(37.792 + i * 0.000002, -122.447 + i * 0.000002) for i in range(40)]
+        for points, grouped in ((fleet, False), (trace, True)):
+            lats, lons = zip(*points)
+            with patch.object(self.store, "_nearest_vectorized", wraps=self.store._nearest_vectorized) as single:
+                batch = self.store.nearest_batch(lats, lons)
+            # Grouped queries are answered from shared windows, the fleet point by point
+            if grouped:
+                self.assertLess(single.call_count, len(points) // 2)
+            else:
+                self.assertEqual(single.call_count, len(points))
+            for match, lat, lon in zip(batch, lats, lons):
+                self.assertAlmostEqual(match[1], self.store.nearest(lat, lon)[1], places=6)
+
+    def test_batch_on_empty_dataset(self):
+        self.assertEqual(find_cleaning_data_batch(compile_segments({}), [37.8], [-122.44], [0]), [None])
+
+    def test_empty_dataset(self):
+        self.assertIsNone(compile_segments({}).nearest(37.8, -122.44))
+        self.assertIsNone(find_cleaning_data({}, 37.8, -122.44, 0))
+
+    def test_properties_are_deduplicated(self):
+        # Every row shares one of 12 + 12 distinct property dicts
+        self.assertEqual(len(self.store.properties), 24)
+        self.assertEqual(len(self.store), 12 * 11 * 2 + 12 * 11)
+
+    def test_cursor_matches_full_search_along_trajectory(self):
+        for np_module in (geometry.np, None):
+            with patch.object(geometry, "np", np_module):
+                cursor = geometry.SegmentCursor()
+                lat, lon = 37.792, -122.447
+                rng = random.Random(7)
+                for _ in range(400):
+                    lat += rng.uniform(-0.00004, 0.00004)
+                    lon += rng.uniform(-0.00004, 0.00004)
+                    seg_id, dist = cursor.nearest(self.store, lat, lon)
+                    expected_id, expected_dist = self.store.nearest(lat, lon)
+                    self.assertAlmostEqual(dist, expected_dist, places=6)
+                    self.assertEqual(self.store.prop_id[seg_id], self.store.prop_id[expected_id])
+                # A slowly moving car mostly stays inside the cached window
+                self.assertGreater(cursor.reused, cursor.searched)
+
+    def test_cursor_resets_on_new_store(self):
+        cursor = geometry.SegmentCursor()
+        cursor.nearest(self.store, 37.792, -122.447)
+        other = compile_segments(make_street_grid(rows=3, cols=3))
+        self.assertEqual(cursor.nearest(other, 37.792, -122.447), other.nearest(37.792, -122.447))
+        self.assertEqual(cursor.searched, 2)
+
+    def test_lookup_cache_hits_jitter_and_invalidates_on_new_dataset(self):
+        cache = LookupCache(size=2)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"n": len(calls)}
+
+        first = cache.lookup(self.store, 37.791231, -122.448771, 10, compute)
+        # Sub-metre jitter and a heading in the same side bucket reuse the result
+        self.assertIs(cache.lookup(self.store, 37.791232, -122.448772, 80, compute), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # Turning around is a different side bucket
+        cache.lookup(self.store, 37.791231, -122.448771, 190, compute)
+        self.assertEqual(cache.misses, 2)
+
+        # Oldest entry is evicted beyond the size bound
+        cache.lookup(self.store, 37.8, -122.44, 10, compute)
+        self.assertEqual(len(cache), 2)
+        cache.lookup(self.store, 37.791231, -122.448771, 10, compute)
+        self.assertEqual(cache.misses, 4)
+
+        # A new dataset version drops everything cached for the old one
+        other = compile_segments(make_street_grid(rows=2, cols=2))
+        self.assertNotEqual(other.version, self.store.version)
+        cache.lookup(other, 37.8, -122.44, 10, compute)
+        self.assertEqual((len(cache), cache.misses), (1, 5))
+
+    def test_rotation_bucket_determines_side(self):
+        for bearing in range(0, 360, 5):
+            sides = {}
+            for rotation in range(0, 360):
+                sides.setdefault(rotation_bucket(rotation), set()).add(heading_side(bearing, rotation))
+            self.assertTrue(all(len(found) == 1 for found in sides.values()), bearing)
+
+    def test_find_cleaning_data_accepts_store(self):
+        result = find_cleaning_data(self.store, 37.79 + 0.0011 * 3 + 0.00005, -122.45 + 0.0011 * 4.5, 90)
+        self.assertEqual(result["street"], "Row 3")
+        self.assertEqual(result["parkedOnSide"], "South")
+
+
+def square(x0, y0, size):
+    return [[[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]]
+
+
+class NeighborhoodIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = geometry.compile_neighborhoods({
+            "features": [
+                {"properties": {"FileName": "West"}, "geometry": {"type": "MultiPolygon", "coordinates": [square(-122.50, 37.75, 0.05)]}},
+                {"properties": {"FileName": "East"}, "geometry": {"type": "MultiPolygon", "coordinates": [square(-122.45, 37.75, 0.05), square(-122.30, 37.75, 0.01)]}},
+                {"properties": {}, "geometry": {"type": "MultiPolygon", "coordinates": [square(0, 0, 1)]}},
+            ]
+        })
+
+    def test_find(self):
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.find(37.77, -122.48), "West")
+        self.assertEqual(self.index.find(37.77, -122.43), "East")
+        self.assertEqual(self.index.find(37.755, -122.295), "East")
+        self.assertIsNone(self.index.find(37.77, -122.35))
+        self.assertIsNone(self.index.find(0.5, 0.5))
+
+    def test_contains(self):
+        self.assertTrue(self.index.contains("East", 37.755, -122.295))
+        self.assertFalse(self.index.contains("West", 37.77, -122.43))
+        self.assertFalse(self.index.contains("Missing", 37.77, -122.43))
+
+    def test_holes_are_excluded(self):
+        with_hole = [square(-122.50, 37.75, 0.05)[0], square(-122.48, 37.77, 0.01)[0]]
+        index = geometry.compile_neighborhoods({
+            "features": [{"properties": {"FileName": "Donut"}, "geometry": {"type": "MultiPolygon", "coordinates": [with_hole]}}]
+        })
+        self.assertEqual(index.find(37.76, -122.49), "Donut")
+        self.assertIsNone(index.find(37.775, -122.475))
+
+    def test_scalar_ring_test_matches_numpy(self):
+        ring = [[0, 0], [4, 0], [4, 4], [2, 1], [0, 4], [0, 0]]
+        points = [(0.5, 2.0), (3.0, 2.0), (3.0, 3.5), (1.0, 0.5), (5.0, 1.0)]
+        expected = [geometry.point_in_ring(lat, lon, geometry.compile_ring(ring)) for lon, lat in points]
+        with patch.object(geometry, "np", None):
+            compiled = geometry.compile_ring(ring)
+            actual = [geometry.point_in_ring(lat, lon, compiled) for lon, lat in points]
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual, [True, True, False, True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+# Import the local mock FIRST before any potential HA imports
+import tests.mock_homeassistant as mock_ha
+
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+
+from custom_components.sf_street_cleaning.geometry import compile_segments, find_cleaning_data
+from custom_components.sf_street_cleaning.schedule import (
+    compile_side_schedule,
+    next_window,
+    to_datetime,
+)
+
+
+def ts(text):
+    return datetime.fromisoformat(text).timestamp()
+
+
+class ScheduleTests(unittest.TestCase):
+    def test_bare_string_uses_default_duration(self):
+        starts, ends = compile_side_schedule("2025-12-18T09:00:00-08:00")
+        self.assertEqual(list(starts), [ts("2025-12-18T09:00:00-08:00")])
+        self.assertEqual(ends[0] - starts[0], 2 * 3600)
+
+    def test_occurrences_are_sorted_with_explicit_and_hour_based_ends(self):
+        timeline = compile_side_schedule({
+            "NextNextCleaning": "2025-12-25T09:00:00-08:00",
+            "NextCleaning": "2025-12-18T09:00:00-08:00",
+            "NextCleaningEnd": "2025-12-18T11:30:00-08:00",
+            "FromHour": 9,
+            "ToHour": 12,
+        })
+        starts, ends = timeline
+        self.assertEqual(list(starts), [ts("2025-12-18T09:00:00-08:00"), ts("2025-12-25T09:00:00-08:00")])
+        self.assertEqual(ends[0], ts("2025-12-18T11:30:00-08:00"))
+        self.assertEqual(ends[1] - starts[1], 3 * 3600)
+
+        # In progress, next, and past the last known window
+        self.assertEqual(next_window(timeline, ts("2025-12-18T10:00:00-08:00"))[0], starts[0])
+        self.assertEqual(next_window(timeline, ts("2025-12-18T11:30:00-08:00"))[0], starts[1])
+        self.assertIsNone(next_window(timeline, ts("2025-12-25T12:00:00-08:00")))
+
+    def test_naive_times_are_san_francisco_local(self):
+        starts, _ = compile_side_schedule({"NextCleaning": "2025-07-01T08:00:00"})
+        self.assertEqual(to_datetime(starts[0]).isoformat(), "2025-07-01T08:00:00-07:00")
+
+    def test_unknown_schedule(self):
+        self.assertIsNone(compile_side_schedule({"NextCleaning": "Unknown"}))
+        self.assertIsNone(next_window(None, 0))
+
+    def test_timelines_are_compiled_with_the_dataset(self):
+        store = compile_segments({"features": [{
+            "properties": {"streetname": "Chestnut St", "Sides": {
+                "North": {"NextCleaning": "2025-12-18T09:00:00-08:00"},
+                "South": {"NextCleaning": "Unknown"},
+            }},
+            "geometry": {"type": "LineString", "coordinates": [[-122.44, 37.80], [-122.43, 37.80]]},
+        }]})
+        self.assertEqual(set(store.schedules[0]), {"North"})
+        result = find_cleaning_data(store, 37.8001, -122.435, 270)
+        self.assertEqual(result["parkedOnSide"], "North")
+        self.assertEqual(result["schedule"], store.schedules[0]["North"])
+
+
+if __name__ == "__main__":
+    unittest.main()
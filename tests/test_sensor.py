@@ -1,7 +1,7 @@
 import sys
 import unittest
 from pathlib import Path
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 # Import the local mock FIRST before any potential HA imports
 import tests.mock_homeassistant as mock_ha
@@ -20,6 +20,8 @@ for name in [
     sys.modules.pop(name, None)
 
 import custom_components.sf_street_cleaning.sensor as sensor_mod
+from custom_components.sf_street_cleaning.const import DOMAIN
+from custom_components.sf_street_cleaning.geometry import compile_segments
 
 class FakeState:
     def __init__(self, state, attributes):
@@ -36,22 +38,24 @@ class FakeStates:
 class SensorTests(unittest.TestCase):
     def setUp(self):
         self.sensor_mod = sensor_mod
+        # Tests swap in fake lookups; restore the real one afterwards
+        self.addCleanup(setattr, sensor_mod, "find_cleaning_data", sensor_mod.find_cleaning_data)
 
-    def _make_sensor(self, tracker_attrs, geojson=None):
+    def _make_sensor(self, tracker_attrs, segment_store=None):
         tracker = FakeState("not_home", tracker_attrs)
         mapping = {tracker_attrs["entity_id"]: tracker}
         
         # Create a Mock HomeAssistant instance
         hass = MagicMock()
         hass.states = FakeStates(mapping)
-        hass.data = {self.sensor_mod.DOMAIN: {}}
+        hass.data = {DOMAIN: {}}
         
         sensor = self.sensor_mod.SFStreetCleaningSensor(
             hass=hass,
             device_tracker_id=tracker_attrs["entity_id"],
-            geojson=geojson or {},
             geojson_url=None,
             neighborhoods_index=None,
+            segment_store=compile_segments({}) if segment_store is None else segment_store,
         )
         return sensor
 
@@ -59,7 +63,7 @@ class SensorTests(unittest.TestCase):
         """Test looking for course, then heading, relative to the tracker entity attributes."""
         rotations = []
 
-        def fake_find_cleaning_data(_geojson, _lat, _lon, rotation):
+        def fake_find_cleaning_data(_geojson, _lat, _lon, rotation, cursor=None):
             rotations.append(rotation)
             return {
                 "street": "Test",
@@ -89,6 +93,149 @@ class SensorTests(unittest.TestCase):
         sensor._update_sensor_state()
         self.assertEqual(rotations[-1], 225, "Should convert 'SOUTHWEST' to 225")
 
+    def test_small_moves_reuse_last_match(self):
+        calls = []
+
+        def fake_find_cleaning_data(_segments, lat, lon, rotation, cursor=None):
+            calls.append((lat, lon, rotation))
+            return {
+                "street": "Test",
+                "parkedOnSide": "East",
+                "distance": 1,
+                "median": False,
+                "bearing": 0.0,
+                "nextCleaning": "2026-01-01T10:00:00-08:00",
+            }
+
+        self.sensor_mod.find_cleaning_data = fake_find_cleaning_data
+        attrs = {"entity_id": "device_tracker.test_truck", "latitude": 37.8, "longitude": -122.44, "course": 10}
+        sensor = self._make_sensor(attrs)
+        sensor._update_sensor_state()
+
+        # ~1 m of GPS jitter and a heading that still maps to the East side
+        attrs.update(latitude=37.80001, course=60)
+        sensor._update_sensor_state()
+        self.assertEqual(len(calls), 1)
+
+        # Turning around flips the side bucket
+        attrs.update(course=180)
+        sensor._update_sensor_state()
+        self.assertEqual(len(calls), 2)
+
+        # Moving a block away forces a new lookup
+        attrs.update(latitude=37.801)
+        sensor._update_sensor_state()
+        self.assertEqual(len(calls), 3)
+
+    def test_unchanged_quantized_state_is_not_rewritten(self):
+        distances = iter([10.2, 10.4, 12.6])
+
+        def fake_find_cleaning_data(_segments, _lat, _lon, _rotation, cursor=None):
+            return {"street": "Test", "parkedOnSide": "East", "distance": next(distances), "median": False, "nextCleaning": None}
+
+        self.sensor_mod.find_cleaning_data = fake_find_cleaning_data
+        attrs = {"entity_id": "device_tracker.test_truck", "latitude": 1.0, "longitude": 2.0}
+        sensor = self._make_sensor(attrs)
+        sensor.async_write_ha_state = MagicMock()
+
+        sensor._async_on_tracker_update(None)
+        self.assertEqual(sensor.extra_state_attributes["distance_to_segment"], 10)
+        attrs["latitude"] = 1.001  # new positions, so the lookup memo does not answer
+        sensor._async_on_tracker_update(None)  # 10.4 m still rounds to 10 m
+        self.assertEqual(sensor.async_write_ha_state.call_count, 1)
+        attrs["latitude"] = 1.002
+        sensor._async_on_tracker_update(None)
+        self.assertEqual(sensor.extra_state_attributes["distance_to_segment"], 13)
+        self.assertEqual(sensor.async_write_ha_state.call_count, 2)
+        self.assertIn("distance_to_segment", sensor._unrecorded_attributes)
+
+    def test_next_state_change(self):
+        from datetime import datetime, timedelta, timezone
+
+        start = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+        end = start + timedelta(hours=2)
+        # 30.02 h out: cleaning_in_hours (30) next flips to 29 at 29.5 h
+        when = self.sensor_mod.next_state_change(start, end, start - timedelta(hours=30.02))
+        self.assertAlmostEqual((start - when).total_seconds() / 3600, 29.5, places=6)
+        # With a 0.1 h resolution it flips from 30.0 to 29.9 at 29.95 h
+        when = self.sensor_mod.next_state_change(start, end, start - timedelta(hours=30.02), 0.1)
+        self.assertAlmostEqual((start - when).total_seconds() / 3600, 29.95, places=6)
+        # The fine step takes over for the final hours
+        when = self.sensor_mod.next_state_change(start, end, start - timedelta(hours=3.4))
+        self.assertEqual(start - when, timedelta(hours=3))
+        when = self.sensor_mod.next_state_change(start, end, start - timedelta(hours=2.99))
+        self.assertAlmostEqual((start - when).total_seconds() / 3600, 2.95, places=6)
+        # Warning threshold wins when it comes first
+        when = self.sensor_mod.next_state_change(start, end, start - timedelta(hours=24.03))
+        self.assertEqual(start - when, timedelta(hours=24))
+        # Sweeping ends with the window; nothing is scheduled after that
+        when = self.sensor_mod.next_state_change(start, end, start + timedelta(hours=1.97))
+        self.assertEqual(when, end)
+        self.assertIsNone(self.sensor_mod.next_state_change(start, end, end))
+
+        def wakeups(now, resolution):
+            count = 0
+            while (when := self.sensor_mod.next_state_change(start, end, now, resolution)) is not None:
+                now = when + self.sensor_mod.TRANSITION_SLACK
+                count += 1
+            return count
+
+        # A car parked a week ahead wakes about hourly, not every 6 minutes
+        week = start - timedelta(days=7)
+        self.assertLess(wakeups(week, 1.0), 250)
+        self.assertGreater(wakeups(week, 0.1), 1600)
+
+    def test_parked_day_writes_about_hourly(self):
+        from datetime import datetime, timedelta, timezone
+
+        now = [datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)]
+        cleaning = now[0] + timedelta(days=3)
+        store = compile_segments({"features": [{
+            "properties": {"streetname": "Chestnut St", "Sides": {"North": {"NextCleaning": cleaning.isoformat()}}},
+            "geometry": {"type": "LineString", "coordinates": [[-122.44, 37.80], [-122.43, 37.80]]},
+        }]})
+        timers = []
+
+        def track(_hass, action, when):
+            timers.append((when, action))
+            return lambda: timers.remove((when, action))
+
+        for resolution, max_writes in ((1.0, 26), (0.1, 241)):
+            timers.clear()
+            with patch.object(self.sensor_mod, "async_track_point_in_time", track), \
+                    patch.object(self.sensor_mod.dt_util, "now", lambda: now[0]):
+                start = now[0]
+                sensor = self._make_sensor(
+                    {"entity_id": "device_tracker.test_truck", "latitude": 37.8001, "longitude": -122.435, "course": 270},
+                    segment_store=store,
+                )
+                sensor._hours_resolution = resolution
+                sensor.async_write_ha_state = MagicMock()
+                sensor._async_on_tracker_update(None)
+                # A simulated day parked: only the sensor's own timers fire
+                while timers and timers[0][0] <= start + timedelta(days=1):
+                    when, action = timers.pop(0)
+                    now[0] = when
+                    action(when)
+                now[0] = start
+            self.assertEqual(sensor.native_value, "Clear")
+            self.assertLessEqual(sensor.async_write_ha_state.call_count, max_writes)
+            self.assertGreater(sensor.async_write_ha_state.call_count, max_writes - 3)
+
+    def test_loading_until_segments_arrive(self):
+        tracker_attrs = {"entity_id": "device_tracker.test_truck", "latitude": 1.0, "longitude": 2.0}
+        hass = MagicMock()
+        hass.states = FakeStates({tracker_attrs["entity_id"]: FakeState("not_home", tracker_attrs)})
+        hass.data = {DOMAIN: {}}
+        sensor = self.sensor_mod.SFStreetCleaningSensor(
+            hass=hass,
+            device_tracker_id=tracker_attrs["entity_id"],
+            geojson_url="https://example.invalid/Marina.geojson",
+            neighborhoods_index=None,
+        )
+        sensor._update_sensor_state()
+        self.assertEqual(sensor.native_value, "Loading")
+
     def test_neighborhood_match(self):
         sensor = self._make_sensor({"entity_id": "device_tracker.test_truck", "latitude": 0.5, "longitude": 0.5})
         index = {